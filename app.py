@@ -2,13 +2,21 @@
 app.py - Streamlit UI 메인 엔트리포인트
 책임: Admin / New Hire / Dashboard 모드 UI 렌더링
 """
+from datetime import datetime
+
 import streamlit as st
 
-from storage import get_org, set_org, get_knowledge, set_knowledge, get_sessions, set_sessions
+from storage import get_org, set_org, get_sessions, set_sessions
 from agents import get_twins
 from ingestion import extract_knowledge
+from knowledge_store import KnowledgeStore
 from orchestrator import route_agent, answer_with_twin, set_llm_client
 from scoring import simple_review
+from submissions import SubmissionLog, apply_review_score, rubric_fingerprint
+from timeseries import TimeSeriesStore
+from scheduler import get_scheduler
+from tiering import get_tier_stats
+from usage import get_meter
 
 # 페이지 설정
 st.set_page_config(
@@ -18,9 +26,12 @@ st.set_page_config(
 
 # 데이터 로드
 ORG = get_org()
-KNOW = get_knowledge()
+KNOW = KnowledgeStore(ORG.get("knowledge_retention"))
 SESS = get_sessions()
 TWINS = get_twins()
+SUBMISSIONS = SubmissionLog()
+METRICS = TimeSeriesStore()
+get_scheduler().set_limits(ORG.get("rate_limits", {}))
 
 
 def ensure_user(user_id: str) -> None:
@@ -36,12 +47,42 @@ def ensure_user(user_id: str) -> None:
         }
 
 
+def record_metrics(user_id: str) -> None:
+    """사용자 지표 시계열 기록"""
+    user = SESS["users"][user_id]
+    METRICS.record(user_id, {
+        "adapt_score": user["adapt_score"],
+        "risk_score": user["risk_score"],
+    })
+
+
+def trend_rows(user_id: str, granularity: str) -> list:
+    """Dashboard 추이 차트용 행 목록 (최근=원시 포인트, 시간별/일별=평균 롤업)"""
+    series = {}
+    for metric in ("adapt_score", "risk_score"):
+        if granularity == "최근":
+            series[metric] = dict(METRICS.recent(user_id, metric))
+        else:
+            key = "hourly" if granularity == "시간별" else "daily"
+            series[metric] = {p["ts"]: p["avg"] for p in METRICS.rollup(user_id, metric, key)}
+
+    times = sorted(set(series["adapt_score"]) | set(series["risk_score"]))
+    return [
+        {
+            "time": datetime.fromtimestamp(ts),
+            "adapt_score": series["adapt_score"].get(ts),
+            "risk_score": series["risk_score"].get(ts),
+        }
+        for ts in times
+    ]
+
+
 def pick_knowledge_snippet() -> str:
     """최근 지식 스니펫 반환"""
-    items = KNOW.get("items", [])
-    if not items:
+    item = KNOW.latest()
+    if item is None:
         return ""
-    return items[-1]["text"]
+    return item["text"]
 
 
 # ============================================================
@@ -71,6 +112,7 @@ llm_provider = st.sidebar.selectbox(
 
 api_key = ""
 model_name = ""
+tiering = False
 
 if llm_provider != "mock":
     api_key = st.sidebar.text_input(
@@ -92,9 +134,20 @@ if llm_provider != "mock":
             help="OpenAI 모델 선택"
         )
 
+    tiering = st.sidebar.checkbox(
+        "자동 모델 티어링",
+        value=False,
+        help="단순 질문은 빠른 모델로 보내고, 복잡하거나 답변 신뢰도가 낮으면 선택한 모델로 승격"
+    )
+
 if st.sidebar.button("LLM 적용"):
     try:
-        set_llm_client(llm_provider, api_key if api_key else None, model_name if model_name else None)
+        set_llm_client(
+            llm_provider,
+            api_key if api_key else None,
+            model_name if model_name else None,
+            tiering=tiering
+        )
         st.session_state.llm_provider = llm_provider
         st.session_state.llm_connected = True
         if llm_provider == "mock":
@@ -131,21 +184,63 @@ if mode == "Admin(회사 세팅)":
         st.caption("실제 서비스에선 직무별 루브릭 템플릿 + 회사별 커스텀")
         keywords = st.text_input(
             "완료 기준 키워드(콤마)",
-            value="원인,재현,재발방지,로그"
+            value=",".join(ORG.get("rubric", {}).get("acceptance_keywords", ["원인", "재현", "재발방지", "로그"]))
+        )
+
+        st.subheader("토큰 예산")
+        budgets = ORG.get("budgets", {})
+        user_budget = st.number_input(
+            "사용자 일일 토큰 (0=무제한)",
+            min_value=0, step=1000, value=int(budgets.get("user_daily_tokens") or 0)
+        )
+        tenant_budget = st.number_input(
+            "회사 일일 토큰 (0=무제한)",
+            min_value=0, step=10000, value=int(budgets.get("tenant_daily_tokens") or 0)
+        )
+        exceed_options = ["throttle", "downgrade"]
+        current_exceed = budgets.get("on_exceed", "throttle")
+        on_exceed = st.selectbox(
+            "예산 초과 시",
+            exceed_options,
+            index=exceed_options.index(current_exceed) if current_exceed in exceed_options else 0,
+            help="throttle: 질문 차단 / downgrade: 저가 모델로 계속 응답 (80% 이상 사용 시 항상 강등)"
         )
 
     if st.button("저장"):
         new_org = {
+            **ORG,
             "company": company.strip(),
             "role": role.strip(),
             "tools": [t.strip() for t in tools.split(",") if t.strip()],
             "rubric": {
                 "acceptance_keywords": [k.strip() for k in keywords.split(",") if k.strip()]
             },
+            "budgets": {
+                **budgets,
+                "user_daily_tokens": user_budget or None,
+                "tenant_daily_tokens": tenant_budget or None,
+                "on_exceed": on_exceed,
+            },
         }
+        old_keywords = ORG.get("rubric", {}).get("acceptance_keywords", [])
+        new_keywords = new_org["rubric"]["acceptance_keywords"]
         set_org(new_org)
         st.success("회사 설정 저장 완료! (org.json)")
 
+        # 루브릭 변경 시 기존 제출물 재채점
+        if rubric_fingerprint(old_keywords) != rubric_fingerprint(new_keywords):
+            stats = SUBMISSIONS.rescore(new_keywords, SESS["users"])
+            for user in SESS["users"].values():
+                if user.get("last_task"):
+                    user["last_task"]["acceptance_keywords"] = new_keywords
+            set_sessions(SESS)
+            for uid in stats["user_ids"]:
+                record_metrics(uid)
+            st.info(
+                f"루브릭 변경 → 제출물 {stats['affected']}건 재채점 "
+                f"(점수 변경 {stats['changed']}건, 사용자 {len(stats['user_ids'])}명 지표 갱신)"
+            )
+
     st.divider()
     st.subheader("데이터 수집 파이프라인(데모)")
     st.caption("회의 STT / Slack-Discord 대화 / 고객미팅 STT를 업로드하면 지식으로 적재됩니다.")
@@ -165,14 +260,18 @@ if mode == "Admin(회사 세팅)":
             st.warning("텍스트가 비었습니다.")
         else:
             new_items = extract_knowledge(source, text)
-            KNOW["items"].extend(new_items)
-            set_knowledge(KNOW)
+            KNOW.add(new_items)
             st.success(f"{len(new_items)}개 지식 항목 저장 완료!")
             st.write(new_items[:5])
 
     st.divider()
     st.subheader("현재 지식(최근 10개)")
-    for it in KNOW.get("items", [])[-10:]:
+    stats = KNOW.stats()
+    st.caption(
+        f"핫 {stats['hot']}개 · 봉인 대기 {stats['pending']}개 · "
+        f"콜드 {stats['cold']}개 (세그먼트 {stats['segments']}개)"
+    )
+    for it in KNOW.recent(10):
         st.write(f"- [{it['source']}/{it['tag']}] {it['text']}")
 
 
@@ -216,7 +315,7 @@ elif mode == "New Hire(OJT)":
         user["questions"] += 1
         snippet = pick_knowledge_snippet()
         who = route_agent(q)
-        ans = answer_with_twin(TWINS[who], ORG, snippet, q)
+        ans = answer_with_twin(TWINS[who], ORG, snippet, q, user_id=user_id)
         set_sessions(SESS)
         st.markdown(f"### 라우팅: **{who}**")
         st.code(ans)
@@ -230,10 +329,11 @@ elif mode == "New Hire(OJT)":
     )
     if st.button("제출 & 리뷰") and submission.strip() and task:
         score, feedback = simple_review(task, submission)
+        SUBMISSIONS.append(user_id, task, submission, score)
         user["tasks_done"] += 1
-        user["adapt_score"] = min(100, user["adapt_score"] + int(score * 0.1))
-        user["risk_score"] = max(0, user["risk_score"] - int(score * 0.05))
+        apply_review_score(user, score)
         set_sessions(SESS)
+        record_metrics(user_id)
 
         st.success(f"리뷰 점수: **{score}점**")
         st.write("**강점**")
@@ -267,11 +367,51 @@ else:
     cols[2].metric("평균 리스크", avg_risk)
     cols[3].metric("총 완료 업무", total_tasks)
 
+    # 토큰 사용량
+    st.subheader("토큰 사용량")
+    usage_rows = get_meter().snapshot()
+    if usage_rows:
+        daily = get_meter().daily()
+        st.caption(
+            f"오늘 회사 사용량: {daily['tenants'].get(ORG.get('company'), 0):,} 토큰"
+        )
+        st.dataframe(usage_rows, use_container_width=True)
+    else:
+        st.caption("기록된 LLM 사용량이 없습니다.")
+
+    # 모델 티어링
+    tier_stats = get_tier_stats().snapshot()
+    if sum(tier_stats["routed"].values()):
+        st.subheader("모델 티어링")
+        tcols = st.columns(4)
+        tcols[0].metric("빠른 모델 라우팅", tier_stats["routed"]["fast"])
+        tcols[1].metric("상위 모델 라우팅", tier_stats["routed"]["strong"])
+        tcols[2].metric("승격률", f"{tier_stats['escalation_rate']:.1%}")
+        tcols[3].metric("빠른 모델 p50", f"{tier_stats['tiers']['fast']['p50_ms']:.0f} ms")
+        st.write(tier_stats["tiers"])
+
+    # 요청 스케줄러
+    sched = get_scheduler().stats()
+    if sum(sched["dispatched"].values()):
+        st.subheader("LLM 요청 스케줄러")
+        scols = st.columns(4)
+        scols[0].metric("대기(interactive)", sched["queue_depth"]["interactive"])
+        scols[1].metric("대기(batch)", sched["queue_depth"]["batch"])
+        scols[2].metric("대기시간 p95", f"{sched['wait']['interactive']['p95_ms']:.0f} ms")
+        scols[3].metric("429 감지", sched["rate_limited"])
+        st.write(sched)
+
     # 개별 현황
     st.subheader("개별 현황")
+    granularity = st.radio("추이 단위", ["최근", "시간별", "일별"], horizontal=True)
     for uid, u in users.items():
         with st.expander(
             f"{uid} | adapt={u['adapt_score']} risk={u['risk_score']} "
             f"tasks={u['tasks_done']} q={u['questions']}"
         ):
+            rows = trend_rows(uid, granularity)
+            if rows:
+                st.line_chart(rows, x="time", y=["adapt_score", "risk_score"])
+            else:
+                st.caption("기록된 추이가 없습니다.")
             st.write(u)
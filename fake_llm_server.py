@@ -0,0 +1,202 @@
+"""
+fake_llm_server.py - 가짜 LLM HTTP 서버 모듈
+책임: 부하 테스트용 Anthropic/OpenAI 호환 엔드포인트 제공 (지연/지터/오류율 설정)
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class FakeServerConfig:
+    """가짜 서버 동작 설정"""
+    latency_ms: float = 300.0
+    jitter_ms: float = 100.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    answer: str = (
+        "[가짜 응답] 먼저 에러가 처음 발생한 시각을 기준으로 직전 5분간의 요청 로그를 확인해 보세요. "
+        "같은 엔드포인트에서 500 응답이 반복된다면 최근 배포 변경분과 외부 API 타임아웃 설정을 비교하고, "
+        "재현 절차를 정리한 뒤 팀 채널에 공유해 재발 방지 항목까지 함께 논의하는 것을 추천합니다."
+    )
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    """Anthropic Messages / OpenAI Chat Completions 요청 처리기"""
+
+    server: "FakeLLMServer"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send(400, {"error": {"type": "invalid_request_error", "message": "bad json"}})
+            return
+
+        config = self.server.config
+        self._sleep(config)
+
+        status, error = self._roll_error(config)
+        if status:
+            self.server.count("errors")
+            self._send(status, error)
+            return
+
+        if self.path.rstrip("/").endswith("/messages"):
+            self.server.count("anthropic")
+            self._send(200, _anthropic_body(body, config.answer))
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            self.server.count("openai")
+            self._send(200, _openai_body(body, config.answer))
+        else:
+            self._send(404, {"error": {"type": "not_found_error", "message": self.path}})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """요청 로그 출력 억제"""
+        pass
+
+    def _sleep(self, config: FakeServerConfig) -> None:
+        """지연 + 지터 적용"""
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(0.0, delay) / 1000)
+
+    def _roll_error(self, config: FakeServerConfig) -> Tuple[int, Dict[str, Any]]:
+        """오류율에 따라 429/500 응답 결정"""
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return 429, {"type": "error", "error": {"type": "rate_limit_error", "message": "rate limited"}}
+        if roll < config.rate_limit_rate + config.error_rate:
+            return 500, {"type": "error", "error": {"type": "api_error", "message": "internal error"}}
+        return 0, {}
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("retry-after", "0")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """로컬 가짜 LLM 서버 (백그라운드 스레드 실행 지원)"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[FakeServerConfig] = None):
+        super().__init__((host, port), _FakeLLMHandler)
+        self.config = config or FakeServerConfig()
+        self.counters: Dict[str, int] = {"anthropic": 0, "openai": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """서버 기본 URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str) -> None:
+        """요청 카운터 증가"""
+        with self._lock:
+            self.counters[key] += 1
+
+    def start(self) -> "FakeLLMServer":
+        """백그라운드 스레드에서 서버 시작"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """서버 종료"""
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+def _estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 추정 (문자 3개당 1토큰)"""
+    return max(1, len(text) // 3)
+
+
+def _anthropic_body(req: Dict[str, Any], answer: str) -> Dict[str, Any]:
+    """Anthropic Messages API 응답 형식"""
+    prompt = str(req.get("system", "")) + "".join(
+        str(m.get("content", "")) for m in req.get("messages", [])
+    )
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": req.get("model", "fake"),
+        "content": [{"type": "text", "text": answer}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": _estimate_tokens(prompt),
+            "output_tokens": _estimate_tokens(answer),
+        },
+    }
+
+
+def _openai_body(req: Dict[str, Any], answer: str) -> Dict[str, Any]:
+    """OpenAI Chat Completions API 응답 형식"""
+    prompt = "".join(str(m.get("content", "")) for m in req.get("messages", []))
+    prompt_tokens = _estimate_tokens(prompt)
+    completion_tokens = _estimate_tokens(answer)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": req.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": answer},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Anthropic/OpenAI 호환 가짜 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429 응답 비율 (0~1)")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    server = FakeLLMServer(args.host, args.port, config)
+    print(f"가짜 LLM 서버 실행 중: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
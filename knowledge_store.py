@@ -0,0 +1,364 @@
+"""
+knowledge_store.py - 계층형 지식 저장소 모듈
+책임: 핫 지식(메모리/knowledge.json) + 콜드 지식(압축 세그먼트) 보관 및 보존 정책 적용
+
+- 핫 셋: 최근/자주 조회된 항목. knowledge.json의 items에 저장되어 매 실행마다 로드된다.
+- 대기열: 핫 셋에서 밀려난 항목. segment_size만큼 모이면 세그먼트로 봉인된다.
+- 콜드 세그먼트: 불변 gzip JSONL 파일 + 작은 인덱스(index.json). 필요할 때만 읽는다.
+- 조회 기록: 조회 경로에서는 knowledge.json을 다시 쓰지 않고 knowledge_hits.jsonl에 한 줄씩
+  덧붙인다. 다음 적재/보존 정책 적용 시 핫 셋에 합쳐지고 로그는 비워진다.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+import storage
+
+# 기본 보존 정책 (org.json의 knowledge_retention으로 덮어쓰기)
+#   hot_max: 핫 셋 최대 항목 수, hot_days: 핫 셋 유지 기간(일)
+#   tag/source: 그룹별 hot_max/hot_days
+DEFAULT_RETENTION: Dict[str, Any] = {
+    "hot_max": 200,
+    "hot_days": None,
+    "segment_size": 500,
+    "tag": {
+        "rule": {"hot_max": 80},
+        "pitfall": {"hot_max": 80},
+    },
+    "source": {},
+}
+
+_SEGMENT_CACHE_SIZE = 2
+
+# 조회 수 반감기(초): 오래전 조회는 점점 덜 반영된다
+_HIT_HALF_LIFE = 7 * 86400
+# 조회 로그가 이 크기(바이트)를 넘으면 핫 셋에 합쳐 저장
+_HITS_COMPACT_BYTES = 256 * 1024
+
+# 같은 프로세스의 모든 인스턴스가 공유하는 파일 잠금 (읽기-수정-쓰기 직렬화)
+_FILE_LOCK = threading.Lock()
+
+
+def _item_ts(item: Dict[str, Any]) -> float:
+    """항목 생성 시각 (ts 없으면 ingestion id의 밀리초 값 사용)"""
+    if "ts" in item:
+        return item["ts"]
+    parts = str(item.get("id", "")).rsplit("-", 2)
+    if len(parts) == 3 and parts[1].isdigit():
+        return int(parts[1]) / 1000
+    return 0.0
+
+
+def _recency(item: Dict[str, Any]) -> float:
+    """마지막 접근 또는 생성 시각 중 늦은 값"""
+    return max(item.get("last_access", 0.0), _item_ts(item))
+
+
+def _hot_rank(item: Dict[str, Any], now: float) -> tuple:
+    """핫 셋 유지 우선순위 (최근성 → 감쇠된 조회 수 순, 작을수록 먼저 밀려남)"""
+    recency = _recency(item)
+    decayed_hits = item.get("hits", 0) * 0.5 ** ((now - recency) / _HIT_HALF_LIFE)
+    return (recency, decayed_hits)
+
+
+class KnowledgeStore:
+    """핫 셋 + 콜드 세그먼트 계층형 지식 저장소"""
+
+    def __init__(self, retention: Optional[Dict[str, Any]] = None):
+        self.policy = {**DEFAULT_RETENTION, **(retention or {})}
+        self.segment_dir = os.path.join(storage.DATA_DIR, "knowledge_segments")
+        self.index_path = os.path.join(self.segment_dir, "index.json")
+        self.hits_path = os.path.join(storage.DATA_DIR, "knowledge_hits.jsonl")
+        self._lock = threading.Lock()
+        self._segment_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+        self.items: List[Dict[str, Any]] = []
+        self.pending: List[Dict[str, Any]] = []
+        self.index: Dict[str, Any] = {}
+        with _FILE_LOCK:
+            self._reload()
+
+        # 기존 단일 파일 지식 베이스 마이그레이션
+        if len(self.items) > self.policy["hot_max"]:
+            self.enforce()
+
+    # ------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------
+    def recent(self, n: int = 10) -> List[Dict[str, Any]]:
+        """최근 생성된 핫 항목 n개 (오래된 순)"""
+        return self.items[-n:]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """가장 최근에 추가된 항목 (조회 기록)"""
+        with self._lock:
+            if not self.items:
+                return None
+            item = self.items[-1]
+            self._touch(item)
+            return item
+
+    def get(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ID로 항목 조회 (핫 → 대기열 → 콜드 세그먼트 순, 콜드 적중 시 핫 셋으로 승격)
+
+        Args:
+            item_id: 지식 항목 ID
+
+        Returns:
+            항목 딕셔너리 또는 None
+        """
+        with self._lock:
+            for item in self.items:
+                if item["id"] == item_id:
+                    self._touch(item)
+                    return item
+            for item in self.pending:
+                if item["id"] == item_id:
+                    return item
+
+            ts = _item_ts({"id": item_id})
+            for seg in reversed(self.index["segments"]):
+                if ts and not seg["min_ts"] <= ts <= seg["max_ts"]:
+                    continue
+                for item in self._read_segment(seg["name"]):
+                    if item["id"] == item_id:
+                        return self._promote({**item, "segment": seg["name"]})
+            return None
+
+    def iter_cold(self, tag: Optional[str] = None, source: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """콜드 항목 순회 (인덱스로 해당 tag/source가 없는 세그먼트는 건너뜀)"""
+        for seg in self.index["segments"]:
+            if tag and tag not in seg["tags"]:
+                continue
+            if source and source not in seg["sources"]:
+                continue
+            for item in self._read_segment(seg["name"]):
+                if (tag is None or item["tag"] == tag) and (source is None or item["source"] == source):
+                    yield item
+
+    def stats(self) -> Dict[str, int]:
+        """계층별 항목 수"""
+        return {
+            "hot": len(self.items),
+            "pending": len(self.pending),
+            "cold": sum(seg["count"] for seg in self.index["segments"]),
+            "segments": len(self.index["segments"]),
+        }
+
+    # ------------------------------------------------------------
+    # 적재 / 보존 정책
+    # ------------------------------------------------------------
+    def add(self, new_items: List[Dict[str, Any]]) -> None:
+        """새 지식 항목 추가 후 보존 정책 적용"""
+        now = time.time()
+        with self._lock, _FILE_LOCK:
+            self._reload()
+            for item in new_items:
+                item.setdefault("ts", _item_ts(item) or now)
+                self.items.append(item)
+            self._enforce_locked()
+
+    def enforce(self) -> None:
+        """보존 정책 적용: 초과/만료 항목을 대기열로 내리고 가득 차면 세그먼트 봉인"""
+        with self._lock, _FILE_LOCK:
+            self._reload()
+            self._enforce_locked()
+
+    def _enforce_locked(self) -> None:
+        """보존 정책 적용 후 저장 (인스턴스 잠금 + _FILE_LOCK 보유, 직전에 _reload 완료 상태)"""
+        evict = set()
+        now = time.time()
+
+        groups: List[tuple] = [("tag", k, v) for k, v in self.policy["tag"].items()]
+        groups += [("source", k, v) for k, v in self.policy["source"].items()]
+        groups.append((None, None, self.policy))
+
+        for field, value, rule in groups:
+            members = [
+                i for i, item in enumerate(self.items)
+                if i not in evict and (field is None or item.get(field) == value)
+            ]
+            hot_days = rule.get("hot_days")
+            if hot_days is not None:
+                cutoff = now - hot_days * 86400
+                expired = [i for i in members if _recency(self.items[i]) < cutoff]
+                evict.update(expired)
+                members = [i for i in members if i not in evict]
+            hot_max = rule.get("hot_max")
+            if hot_max is not None and len(members) > hot_max:
+                members.sort(key=lambda i: _hot_rank(self.items[i], now))
+                evict.update(members[:len(members) - hot_max])
+
+        if not evict:
+            self._save_hot()
+            return
+
+        kept = []
+        for i, item in enumerate(self.items):
+            if i not in evict:
+                kept.append(item)
+            elif "segment" not in item:  # 이미 봉인된 승격 항목은 버림
+                self.pending.append(item)
+        self.items = kept
+
+        while len(self.pending) >= self.policy["segment_size"]:
+            size = self.policy["segment_size"]
+            self._seal(self.pending[:size])
+            self.pending = self.pending[size:]
+
+        self._save_hot()
+
+    def _insert_hot(self, item: Dict[str, Any]) -> None:
+        """생성 시각 순서를 유지하며 핫 셋에 삽입"""
+        ts = _item_ts(item)
+        pos = len(self.items)
+        while pos > 0 and _item_ts(self.items[pos - 1]) > ts:
+            pos -= 1
+        self.items.insert(pos, item)
+
+    def _promote(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """콜드 항목을 핫 셋으로 승격 (다른 인스턴스가 이미 승격했으면 그 항목 반환)"""
+        with _FILE_LOCK:
+            self._reload()
+            for hot in self.items:
+                if hot["id"] == item["id"]:
+                    self._apply_hits(hot, 1, time.time())
+                    self._append_hit(hot)
+                    return hot
+            self._apply_hits(item, 1, time.time())
+            self._insert_hot(item)
+            self._enforce_locked()
+            return item
+
+    def _touch(self, item: Dict[str, Any]) -> None:
+        """조회 기록: 메모리 반영 + 조회 로그에 덧붙이기 (knowledge.json은 건드리지 않음)"""
+        self._apply_hits(item, 1, time.time())
+        with _FILE_LOCK:
+            self._append_hit(item)
+            if os.path.getsize(self.hits_path) > _HITS_COMPACT_BYTES:
+                self._reload()
+                self._save_hot()
+
+    @staticmethod
+    def _apply_hits(item: Dict[str, Any], count: int, at: float) -> None:
+        item["hits"] = item.get("hits", 0) + count
+        item["last_access"] = max(item.get("last_access", 0.0), at)
+
+    # ------------------------------------------------------------
+    # 영속화
+    # ------------------------------------------------------------
+    def _reload(self) -> None:
+        """
+        디스크의 최신 핫 셋/대기열/인덱스를 읽고 조회 로그를 합침 (_FILE_LOCK 보유 상태)
+
+        변경 작업은 항상 최신 상태 위에서 수행되므로, 오래된 인스턴스가 다른 인스턴스의
+        적재/봉인 결과를 덮어쓰지 않는다.
+        """
+        data = storage.get_knowledge()
+        self.items = data.get("items", [])
+        self.pending = data.get("pending", [])
+        self.index = self._load_index()
+
+        by_id = {item["id"]: item for item in self.items}
+        for item_id, (count, at) in self._read_hits().items():
+            if item_id in by_id:
+                self._apply_hits(by_id[item_id], count, at)
+
+    def _save_hot(self) -> None:
+        """핫 셋/대기열을 원자적으로 저장하고 합쳐진 조회 로그 비우기 (_FILE_LOCK 보유 상태)"""
+        path = storage.KNOW_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"items": self.items, "pending": self.pending}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+        if os.path.exists(self.hits_path):
+            os.remove(self.hits_path)
+
+    def _append_hit(self, item: Dict[str, Any]) -> None:
+        """조회 로그 끝에 1줄 추가 (_FILE_LOCK 보유 상태)"""
+        line = json.dumps({"id": item["id"], "at": time.time()}, separators=(",", ":")) + "\n"
+        os.makedirs(os.path.dirname(self.hits_path) or ".", exist_ok=True)
+        with open(self.hits_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def _read_hits(self) -> Dict[str, tuple]:
+        """조회 로그 집계 ({id: (조회 수, 마지막 조회 시각)})"""
+        hits: Dict[str, tuple] = {}
+        if not os.path.exists(self.hits_path):
+            return hits
+        with open(self.hits_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 중단된 마지막 줄 무시
+                count, at = hits.get(entry["id"], (0, 0.0))
+                hits[entry["id"]] = (count + 1, max(at, entry["at"]))
+        return hits
+
+    def _seal(self, items: List[Dict[str, Any]]) -> None:
+        """항목 묶음을 불변 압축 세그먼트로 기록하고 인덱스 갱신"""
+        os.makedirs(self.segment_dir, exist_ok=True)
+        seq = self.index["next_seq"]
+        name = f"seg-{seq:06d}.jsonl.gz"
+        path = os.path.join(self.segment_dir, name)
+
+        records = [
+            {k: v for k, v in item.items() if k not in ("hits", "last_access")}
+            for item in items
+        ]
+        with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        os.replace(f"{path}.tmp", path)
+
+        tags: Dict[str, int] = {}
+        sources: Dict[str, int] = {}
+        for rec in records:
+            tags[rec["tag"]] = tags.get(rec["tag"], 0) + 1
+            sources[rec["source"]] = sources.get(rec["source"], 0) + 1
+        timestamps = [_item_ts(rec) for rec in records]
+
+        self.index["segments"].append({
+            "name": name,
+            "count": len(records),
+            "min_ts": min(timestamps),
+            "max_ts": max(timestamps),
+            "tags": tags,
+            "sources": sources,
+        })
+        self.index["next_seq"] = seq + 1
+        self._save_index()
+
+    def _read_segment(self, name: str) -> List[Dict[str, Any]]:
+        """세그먼트 지연 로드 (최근 사용 세그먼트 소량 캐시)"""
+        if name in self._segment_cache:
+            self._segment_cache.move_to_end(name)
+            return self._segment_cache[name]
+
+        with gzip.open(os.path.join(self.segment_dir, name), "rt", encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+
+        self._segment_cache[name] = items
+        if len(self._segment_cache) > _SEGMENT_CACHE_SIZE:
+            self._segment_cache.popitem(last=False)
+        return items
+
+    def _load_index(self) -> Dict[str, Any]:
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"next_seq": 1, "segments": []}
+
+    def _save_index(self) -> None:
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
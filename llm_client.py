@@ -2,37 +2,158 @@
 llm_client.py - LLM 클라이언트 추상화 모듈
 책임: Claude/OpenAI API 통합 및 Mock 모드 지원
 """
+import copy
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from agents import TwinAgent
+from scheduler import INTERACTIVE, RequestScheduler, get_scheduler
+from tiering import FAST, STRONG, classify_question, get_tier_stats, is_low_confidence
+from usage import get_meter
+
+# 예산 초과 임박 시 강등할 저가 모델
+DOWNGRADE_MODELS = {
+    "claude-sonnet-4-20250514": "claude-3-haiku-20240307",
+    "claude-3-5-sonnet-20241022": "claude-3-haiku-20240307",
+    "gpt-4o": "gpt-4o-mini",
+    "gpt-4-turbo": "gpt-4o-mini",
+}
+
+# 클라이언트 max_tokens (스케줄러 TPM 예약량)
+MAX_OUTPUT_TOKENS = 1024
+
+# 티어링 시 단순 질문에 사용할 빠른 모델
+FAST_MODELS = {
+    "claude": "claude-3-haiku-20240307",
+    "openai": "gpt-4o-mini",
+}
+
+
+# 현재 스레드에서 마지막으로 기록된 호출의 실제 토큰 수 (스케줄러 TPM 정산용)
+_last_usage = threading.local()
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 추정 (문자 3개당 1토큰, 한/영 혼용 기준)"""
+    return max(1, len(text) // 3)
 
 
 class BaseLLMClient(ABC):
     """LLM 클라이언트 추상 베이스 클래스"""
 
+    provider: str = "base"
+    model: str = ""
+
     @abstractmethod
     def generate_response(
         self,
         twin: TwinAgent,
         org: Dict[str, Any],
         knowledge: str,
-        question: str
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = "",
+        user_id: Optional[str] = None
     ) -> str:
-        """Twin 페르소나로 응답 생성"""
+        """
+        Twin 페르소나로 응답 생성
+
+        Args:
+            twin: TwinAgent 인스턴스
+            org: 조직 설정
+            knowledge: 관련 지식 스니펫
+            question: 사용자 질문
+            history: 최근 대화 메시지 [{role, content}, ...] (선택)
+            summary: 이전 대화 요약 (선택)
+            user_id: 사용량 집계용 사용자 ID (선택)
+        """
         pass
 
+    def with_model(self, model: str) -> "BaseLLMClient":
+        """같은 설정으로 모델만 바꾼 클라이언트 반환"""
+        if model == self.model:
+            return self
+        clone = copy.copy(self)
+        clone.model = model
+        return clone
+
+    def with_priority(self, priority: str) -> "BaseLLMClient":
+        """스케줄러 우선순위를 바꾼 클라이언트 반환 (스케줄링 없는 클라이언트는 그대로)"""
+        return self
+
+    def estimate_request_tokens(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        knowledge: str,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = ""
+    ) -> int:
+        """
+        호출 1건의 최대 예상 토큰 수 (시스템 프롬프트 + 대화 + 질문 + 최대 출력)
+
+        Args:
+            twin: TwinAgent 인스턴스
+            org: 조직 설정
+            knowledge: 관련 지식 스니펫
+            question: 사용자 질문
+            history: 최근 대화 메시지 (선택)
+            summary: 이전 대화 요약 (선택)
+
+        Returns:
+            예상 토큰 수
+        """
+        system_prompt = self._build_system_prompt(twin, org, knowledge, summary)
+        messages = "".join(m["content"] for m in history or []) + question
+        return estimate_tokens(system_prompt + messages) + MAX_OUTPUT_TOKENS
+
+    def _build_system_prompt(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        knowledge: str,
+        summary: str = ""
+    ) -> str:
+        """시스템 프롬프트 (제공자 클라이언트에서 재정의)"""
+        return summary + knowledge
+
+    def _record_usage(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        user_id: Optional[str],
+        input_tokens: int,
+        output_tokens: int,
+        cached_tokens: int = 0
+    ) -> None:
+        """호출 사용량을 전역 집계기에 기록"""
+        _last_usage.tokens = input_tokens + output_tokens
+        get_meter().record(
+            user_id, twin.name, self.provider, self.model,
+            input_tokens, output_tokens, cached_tokens,
+            tenant=org.get("company"),
+        )
+
 
 class MockLLMClient(BaseLLMClient):
     """Mock LLM 클라이언트 (API 키 없이 동작)"""
 
+    provider = "mock"
+    model = "mock"
+
     def generate_response(
         self,
         twin: TwinAgent,
         org: Dict[str, Any],
         knowledge: str,
-        question: str
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = "",
+        user_id: Optional[str] = None
     ) -> str:
         lines = [
             f"[{twin.name} | {twin.role}]",
@@ -43,6 +164,9 @@ class MockLLMClient(BaseLLMClient):
             "내가 보는 핵심:",
         ]
 
+        if history or summary:
+            lines.append(f"- (이전 대화 {len(history or []) // 2}턴 + 요약 참고)")
+
         if knowledge:
             lines.append(f"- (회사 지식 참고) {knowledge[:280]}")
 
@@ -57,16 +181,28 @@ class MockLLMClient(BaseLLMClient):
             f"- {twin.decision_rules[0] if twin.decision_rules else '근거 기반 판단'}",
         ])
 
-        return "\n".join(lines)
+        answer = "\n".join(lines)
+        prompt = "".join(m["content"] for m in history or []) + summary + knowledge + question
+        self._record_usage(twin, org, user_id, estimate_tokens(prompt), estimate_tokens(answer))
+        return answer
 
 
 class ClaudeLLMClient(BaseLLMClient):
     """Anthropic Claude LLM 클라이언트"""
 
-    def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514"):
+    provider = "claude"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "claude-sonnet-4-20250514",
+        base_url: Optional[str] = None,
+        max_retries: Optional[int] = None
+    ):
         try:
             import anthropic
-            self.client = anthropic.Anthropic(api_key=api_key)
+            options = {} if max_retries is None else {"max_retries": max_retries}
+            self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, **options)
             self.model = model
         except ImportError:
             raise ImportError("anthropic 패키지를 설치하세요: pip install anthropic")
@@ -76,16 +212,26 @@ class ClaudeLLMClient(BaseLLMClient):
         twin: TwinAgent,
         org: Dict[str, Any],
         knowledge: str,
-        question: str
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = "",
+        user_id: Optional[str] = None
     ) -> str:
-        system_prompt = self._build_system_prompt(twin, org, knowledge)
+        system_prompt = self._build_system_prompt(twin, org, knowledge, summary)
 
         try:
             response = self.client.messages.create(
                 model=self.model,
-                max_tokens=1024,
+                max_tokens=MAX_OUTPUT_TOKENS,
                 system=system_prompt,
-                messages=[{"role": "user", "content": question}]
+                messages=[*(history or []), {"role": "user", "content": question}]
+            )
+            usage = response.usage
+            self._record_usage(
+                twin, org, user_id,
+                usage.input_tokens,
+                usage.output_tokens,
+                getattr(usage, "cache_read_input_tokens", None) or 0,
             )
             return response.content[0].text
         except Exception as e:
@@ -95,7 +241,8 @@ class ClaudeLLMClient(BaseLLMClient):
         self,
         twin: TwinAgent,
         org: Dict[str, Any],
-        knowledge: str
+        knowledge: str,
+        summary: str = ""
     ) -> str:
         return f"""당신은 {org.get('company', 'Veluga')} 회사의 {twin.name}입니다.
 
@@ -111,6 +258,9 @@ class ClaudeLLMClient(BaseLLMClient):
 [회사 지식/컨텍스트]
 {knowledge if knowledge else '(없음)'}
 
+[이전 대화 요약]
+{summary if summary else '(없음)'}
+
 [지시사항]
 - 신입 직원의 OJT를 돕는 멘토 역할을 합니다.
 - 질문에 대해 당신의 역할과 스타일에 맞게 답변하세요.
@@ -121,10 +271,19 @@ class ClaudeLLMClient(BaseLLMClient):
 class OpenAILLMClient(BaseLLMClient):
     """OpenAI GPT LLM 클라이언트"""
 
-    def __init__(self, api_key: str, model: str = "gpt-4o"):
+    provider = "openai"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o",
+        base_url: Optional[str] = None,
+        max_retries: Optional[int] = None
+    ):
         try:
             import openai
-            self.client = openai.OpenAI(api_key=api_key)
+            options = {} if max_retries is None else {"max_retries": max_retries}
+            self.client = openai.OpenAI(api_key=api_key, base_url=base_url, **options)
             self.model = model
         except ImportError:
             raise ImportError("openai 패키지를 설치하세요: pip install openai")
@@ -134,20 +293,33 @@ class OpenAILLMClient(BaseLLMClient):
         twin: TwinAgent,
         org: Dict[str, Any],
         knowledge: str,
-        question: str
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = "",
+        user_id: Optional[str] = None
     ) -> str:
-        system_prompt = self._build_system_prompt(twin, org, knowledge)
+        system_prompt = self._build_system_prompt(twin, org, knowledge, summary)
 
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
+                    *(history or []),
                     {"role": "user", "content": question}
                 ],
-                max_tokens=1024,
+                max_tokens=MAX_OUTPUT_TOKENS,
                 temperature=0.7
             )
+            usage = response.usage
+            if usage is not None:
+                details = getattr(usage, "prompt_tokens_details", None)
+                self._record_usage(
+                    twin, org, user_id,
+                    usage.prompt_tokens,
+                    usage.completion_tokens,
+                    getattr(details, "cached_tokens", None) or 0,
+                )
             return response.choices[0].message.content
         except Exception as e:
             return f"[OpenAI API 오류] {str(e)}"
@@ -156,7 +328,8 @@ class OpenAILLMClient(BaseLLMClient):
         self,
         twin: TwinAgent,
         org: Dict[str, Any],
-        knowledge: str
+        knowledge: str,
+        summary: str = ""
     ) -> str:
         return f"""당신은 {org.get('company', 'Veluga')} 회사의 {twin.name}입니다.
 
@@ -172,6 +345,9 @@ class OpenAILLMClient(BaseLLMClient):
 [회사 지식/컨텍스트]
 {knowledge if knowledge else '(없음)'}
 
+[이전 대화 요약]
+{summary if summary else '(없음)'}
+
 [지시사항]
 - 신입 직원의 OJT를 돕는 멘토 역할을 합니다.
 - 질문에 대해 당신의 역할과 스타일에 맞게 답변하세요.
@@ -179,10 +355,139 @@ class OpenAILLMClient(BaseLLMClient):
 - 한국어로 답변하세요."""
 
 
+class ScheduledLLMClient(BaseLLMClient):
+    """중앙 스케줄러를 거쳐 호출하는 클라이언트 (RPM/TPM 한도 + 사용자 공정 큐)"""
+
+    def __init__(
+        self,
+        inner: BaseLLMClient,
+        scheduler: Optional[RequestScheduler] = None,
+        priority: str = INTERACTIVE
+    ):
+        self.inner = inner
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.provider = inner.provider
+        self.model = inner.model
+
+    def with_model(self, model: str) -> BaseLLMClient:
+        if model == self.model:
+            return self
+        return ScheduledLLMClient(self.inner.with_model(model), self.scheduler, self.priority)
+
+    def with_priority(self, priority: str) -> BaseLLMClient:
+        if priority == self.priority:
+            return self
+        return ScheduledLLMClient(self.inner, self.scheduler, priority)
+
+    def estimate_request_tokens(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        knowledge: str,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = ""
+    ) -> int:
+        return self.inner.estimate_request_tokens(twin, org, knowledge, question, history, summary)
+
+    def generate_response(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        knowledge: str,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = "",
+        user_id: Optional[str] = None
+    ) -> str:
+        cost = self.inner.estimate_request_tokens(twin, org, knowledge, question, history, summary)
+
+        def call() -> str:
+            # 스케줄러 작업 스레드에서 실행: 실제 사용량으로 TPM 예약분 정산
+            _last_usage.tokens = None
+            answer = self.inner.generate_response(
+                twin, org, knowledge, question,
+                history=history, summary=summary, user_id=user_id
+            )
+            if _last_usage.tokens is not None:
+                self.scheduler.settle(self.provider, self.model, cost, _last_usage.tokens)
+            return answer
+
+        future = self.scheduler.submit(
+            self.provider, self.model, user_id, call, cost=cost, priority=self.priority
+        )
+        return future.result()
+
+
+class TieredLLMClient(BaseLLMClient):
+    """빠른 모델 우선 + 필요 시 상위 모델 승격 클라이언트"""
+
+    def __init__(self, fast: BaseLLMClient, strong: BaseLLMClient):
+        self.fast = fast
+        self.strong = strong
+        self.provider = strong.provider
+        self.model = strong.model
+
+    def with_model(self, model: str) -> BaseLLMClient:
+        """예산 강등 시 티어링 없이 지정 모델만 사용"""
+        if model == self.model:
+            return self
+        return self.strong.with_model(model)
+
+    def with_priority(self, priority: str) -> BaseLLMClient:
+        return TieredLLMClient(self.fast.with_priority(priority), self.strong.with_priority(priority))
+
+    def estimate_request_tokens(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        knowledge: str,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = ""
+    ) -> int:
+        """상위 모델 호출 기준으로 추정 (승격 여부는 호출 전에 알 수 없음)"""
+        return self.strong.estimate_request_tokens(twin, org, knowledge, question, history, summary)
+
+    def generate_response(
+        self,
+        twin: TwinAgent,
+        org: Dict[str, Any],
+        knowledge: str,
+        question: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        summary: str = "",
+        user_id: Optional[str] = None
+    ) -> str:
+        stats = get_tier_stats()
+        tier = classify_question(question, history)
+        stats.routed(tier)
+        args = (twin, org, knowledge, question)
+        kwargs = {"history": history, "summary": summary, "user_id": user_id}
+
+        if tier == FAST:
+            started = time.perf_counter()
+            answer = self.fast.generate_response(*args, **kwargs)
+            stats.call(FAST, time.perf_counter() - started)
+            if not is_low_confidence(answer, question):
+                return answer
+            stats.escalated()
+
+        started = time.perf_counter()
+        answer = self.strong.generate_response(*args, **kwargs)
+        stats.call(STRONG, time.perf_counter() - started)
+        return answer
+
+
 def create_llm_client(
     provider: str = "mock",
     api_key: Optional[str] = None,
-    model: Optional[str] = None
+    model: Optional[str] = None,
+    base_url: Optional[str] = None,
+    tiering: bool = False,
+    scheduled: bool = True,
+    max_retries: Optional[int] = None
 ) -> BaseLLMClient:
     """
     LLM 클라이언트 팩토리 함수
@@ -190,7 +495,11 @@ def create_llm_client(
     Args:
         provider: "mock", "claude", "openai"
         api_key: API 키 (mock 제외)
-        model: 모델명 (선택)
+        model: 모델명 (선택, 티어링 시 상위 모델)
+        base_url: API 엔드포인트 (선택, 부하 테스트용 가짜 서버 등)
+        tiering: 단순 질문은 빠른 모델로 보내는 티어링 사용 여부
+        scheduled: 중앙 스케줄러(RPM/TPM 한도, 공정 큐) 경유 여부
+        max_retries: SDK 자동 재시도 횟수 (없으면 SDK 기본값)
 
     Returns:
         BaseLLMClient 인스턴스
@@ -201,15 +510,28 @@ def create_llm_client(
     if not api_key:
         raise ValueError(f"{provider} 사용을 위해 API 키가 필요합니다.")
 
+    client: BaseLLMClient
     if provider == "claude":
-        return ClaudeLLMClient(
+        client = ClaudeLLMClient(
             api_key=api_key,
-            model=model or "claude-sonnet-4-20250514"
+            model=model or "claude-sonnet-4-20250514",
+            base_url=base_url,
+            max_retries=max_retries
         )
     elif provider == "openai":
-        return OpenAILLMClient(
+        client = OpenAILLMClient(
             api_key=api_key,
-            model=model or "gpt-4o"
+            model=model or "gpt-4o",
+            base_url=base_url,
+            max_retries=max_retries
         )
     else:
         raise ValueError(f"지원하지 않는 provider: {provider}")
+
+    if scheduled:
+        client = ScheduledLLMClient(client)
+
+    fast_model = FAST_MODELS[provider]
+    if tiering and fast_model != client.model:
+        return TieredLLMClient(fast=client.with_model(fast_model), strong=client)
+    return client
@@ -0,0 +1,355 @@
+"""
+loadtest.py - 동시 신입 사용자 부하 테스트 모듈
+책임: New Hire(OJT) 실제 코드 경로를 N명 가상 사용자로 구동하고 결과를 JSON으로 보고
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import storage
+from agents import get_twins
+from fake_llm_server import FakeLLMServer, FakeServerConfig
+from ingestion import extract_knowledge
+from knowledge_store import KnowledgeStore
+from llm_client import FAST_MODELS, BaseLLMClient, create_llm_client
+from orchestrator import answer_with_twin, route_agent
+from scheduler import BATCH, DEFAULT_LIMITS, INTERACTIVE, get_scheduler
+from scoring import simple_review
+from submissions import SubmissionLog, apply_review_score
+from tiering import get_tier_stats
+from usage import get_meter
+
+# 가상 사용자 질문/제출 샘플
+_QUESTIONS = [
+    "이 장애 원인 확인을 위해 어떤 로그를 봐야 하나요?",
+    "이번 스프린트 우선순위는 어떻게 정하나요?",
+    "요구사항 정의 문서는 어디에 있나요?",
+    "반응형 화면 테스트는 어떤 기기로 하나요?",
+    "배포 전 staging 테스트 절차가 궁금합니다.",
+]
+_SUBMISSIONS = [
+    "원인: 배포 후 커넥션 풀 고갈. 재현: 동시 요청 200 이상. 재발방지: 풀 크기 모니터링 알림. 로그: pool timeout",
+    "원인은 캐시 미스로 추정합니다. 로그 확인 필요.",
+    "재현 조건을 찾는 중입니다.",
+]
+_DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "demo_inputs")
+_DEMO_INPUTS = {
+    "meeting_stt": os.path.join(_DEMO_DIR, "meeting_transcript.txt"),
+    "slack_discord": os.path.join(_DEMO_DIR, "slack_export.txt"),
+}
+_ERROR_PREFIXES = ("[Claude API 오류]", "[OpenAI API 오류]")
+_DEFAULT_MODELS = {"claude": "claude-sonnet-4-20250514", "openai": "gpt-4o"}
+
+
+class _Recorder:
+    """스레드 안전 측정값 수집기"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {
+            "total": [], "knowledge": [], "llm": [], "review": [], "storage": []
+        }
+        self.errors: Dict[str, int] = {"knowledge": 0, "llm": 0, "storage": 0}
+        self.committed: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.latencies[stage].append(seconds * 1000)
+
+    def error(self, stage: str) -> None:
+        with self._lock:
+            self.errors[stage] += 1
+
+    def commit(self, user_id: str) -> None:
+        with self._lock:
+            self.committed[user_id] = self.committed.get(user_id, 0) + 1
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """최근접 순위 방식 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[idx], 2)
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "p50": _percentile(values, 50),
+        "p99": _percentile(values, 99),
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+def _seed_data_dir(path: str) -> None:
+    """격리된 데이터 디렉토리에 데모 지식 적재"""
+    storage.set_data_dir(path)
+    know = KnowledgeStore()
+    for source, demo_path in _DEMO_INPUTS.items():
+        with open(demo_path, "r", encoding="utf-8") as f:
+            know.add(extract_knowledge(source, f.read()))
+
+
+def _pick_knowledge_snippet() -> str:
+    """app.py와 동일한 최근 지식 스니펫 선택 (Streamlit 재실행처럼 매번 로드)"""
+    item = KnowledgeStore(storage.get_org().get("knowledge_retention")).latest()
+    if item is None:
+        return ""
+    return item["text"]
+
+
+def _virtual_user(
+    user_id: str,
+    iterations: int,
+    client: BaseLLMClient,
+    think_ms: float,
+    rec: _Recorder,
+    log: SubmissionLog,
+    priority: str = INTERACTIVE
+) -> None:
+    """가상 신입 1명: 질문 → 지식 선택 → 답변 → 제출 → 리뷰 → 세션 저장 반복"""
+    twins = get_twins()
+    org = storage.get_org()
+    task = {
+        "title": "로그 기반 장애 원인 요약",
+        "acceptance_keywords": org.get("rubric", {}).get("acceptance_keywords", []),
+    }
+
+    for _ in range(iterations):
+        started = time.perf_counter()
+        question = random.choice(_QUESTIONS)
+
+        t0 = time.perf_counter()
+        who = route_agent(question)
+        try:
+            snippet = _pick_knowledge_snippet()
+        except (json.JSONDecodeError, OSError):
+            snippet = ""
+            rec.error("knowledge")
+        rec.add("knowledge", time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        ans = answer_with_twin(
+            twins[who], org, snippet, question,
+            llm_client=client, user_id=user_id, priority=priority
+        )
+        rec.add("llm", time.perf_counter() - t0)
+        if ans.startswith(_ERROR_PREFIXES):
+            rec.error("llm")
+
+        t0 = time.perf_counter()
+        submission = random.choice(_SUBMISSIONS)
+        score, _ = simple_review(task, submission)
+        rec.add("review", time.perf_counter() - t0)
+
+        # app.py와 같은 read-modify-write 패턴
+        t0 = time.perf_counter()
+        try:
+            log.append(user_id, task, submission, score)
+            sess = storage.get_sessions()
+            user = sess["users"].setdefault(user_id, {
+                "name": user_id, "adapt_score": 50, "risk_score": 50,
+                "tasks_done": 0, "questions": 0, "last_task": None,
+            })
+            user["questions"] += 1
+            user["tasks_done"] += 1
+            apply_review_score(user, score)
+            storage.set_sessions(sess)
+            rec.commit(user_id)
+        except (json.JSONDecodeError, OSError):
+            rec.error("storage")
+        rec.add("storage", time.perf_counter() - t0)
+
+        rec.add("total", time.perf_counter() - started)
+        if think_ms:
+            time.sleep(think_ms / 1000)
+
+
+def _count_lost_updates(rec: _Recorder) -> Dict[str, int]:
+    """커밋 성공 횟수 대비 최종 세션에 남은 카운트 비교"""
+    try:
+        users = storage.get_sessions().get("users", {})
+    except json.JSONDecodeError:
+        users = {}
+
+    expected = sum(rec.committed.values())
+    observed = sum(
+        min(users.get(uid, {}).get("tasks_done", 0), count)
+        for uid, count in rec.committed.items()
+    )
+    return {
+        "expected_updates": expected,
+        "observed_updates": observed,
+        "lost_updates": expected - observed,
+    }
+
+
+def run_load_test(
+    users: int = 10,
+    iterations: int = 5,
+    provider: str = "claude",
+    model: Optional[str] = None,
+    server_config: Optional[FakeServerConfig] = None,
+    think_ms: float = 0.0,
+    data_dir: Optional[str] = None,
+    tiering: bool = False,
+    scheduled: bool = True,
+    batch_users: int = 0,
+    rate_limits: Optional[Dict[str, Dict[str, int]]] = None
+) -> Dict[str, Any]:
+    """
+    부하 테스트 실행
+
+    Args:
+        users: 동시 가상 사용자 수
+        iterations: 사용자당 반복 횟수
+        provider: "mock", "claude", "openai"
+        model: 모델명 (선택)
+        server_config: 가짜 LLM 서버 설정 (mock 제외)
+        think_ms: 반복 사이 대기 시간(ms)
+        data_dir: 데이터 디렉토리 (없으면 임시 디렉토리)
+        tiering: 빠른 모델 우선 티어링 사용 여부
+        scheduled: 중앙 스케줄러 경유 여부
+        batch_users: batch 우선순위로 동작할 가상 사용자 수
+        rate_limits: 모델별 RPM/TPM 한도 ({모델명: {"rpm", "tpm"}})
+
+    Returns:
+        처리량/지연/오류/유실 업데이트 보고서 딕셔너리
+    """
+    tmp = None
+    if data_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="agentcamp-load-")
+        data_dir = tmp.name
+    original_dir = storage.DATA_DIR
+    _seed_data_dir(data_dir)
+
+    server = None
+    try:
+        if provider == "mock":
+            client = create_llm_client("mock")
+        else:
+            server = FakeLLMServer(config=server_config).start()
+            base_url = server.base_url if provider == "claude" else f"{server.base_url}/v1"
+            if rate_limits:
+                get_scheduler().set_limits(rate_limits)
+            # SDK 자동 재시도를 끄고 서버가 돌려준 오류를 그대로 집계
+            client = create_llm_client(
+                provider, "fake-key", model,
+                base_url=base_url, tiering=tiering, scheduled=scheduled, max_retries=0
+            )
+
+        rec = _Recorder()
+        log = SubmissionLog()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            futures = [
+                pool.submit(
+                    _virtual_user, f"vu-{i:03d}", iterations, client, think_ms, rec, log,
+                    BATCH if i < batch_users else INTERACTIVE
+                )
+                for i in range(users)
+            ]
+            for fut in futures:
+                fut.result()
+        elapsed = time.perf_counter() - started
+
+        completed = len(rec.latencies["total"])
+        usage_rows = [r for r in get_meter().snapshot() if r["user"].startswith("vu-")]
+        return {
+            "provider": provider,
+            "model": getattr(client, "model", None),
+            "users": users,
+            "iterations_per_user": iterations,
+            "duration_s": round(elapsed, 3),
+            "completed_iterations": completed,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {stage: _summarize(v) for stage, v in rec.latencies.items()},
+            "errors": dict(rec.errors),
+            "tokens": {
+                "input": sum(r["input_tokens"] for r in usage_rows),
+                "output": sum(r["output_tokens"] for r in usage_rows),
+            },
+            "server": dict(server.counters) if server else None,
+            "tiering": get_tier_stats().snapshot() if tiering else None,
+            "scheduler": get_scheduler().stats() if scheduled and server else None,
+            **_count_lost_updates(rec),
+        }
+    finally:
+        if server:
+            server.stop()
+        get_meter().flush()
+        storage.set_data_dir(original_dir)
+        if tmp:
+            tmp.cleanup()
+
+
+def _cli_rate_limits(args: argparse.Namespace) -> Optional[Dict[str, Dict[str, int]]]:
+    """--rpm/--tpm 옵션을 테스트 대상 모델(티어링 시 빠른 모델 포함) 한도로 변환"""
+    if (args.rpm is None and args.tpm is None) or args.provider == "mock":
+        return None
+    models = {args.model or _DEFAULT_MODELS[args.provider]}
+    if args.tiering:
+        models.add(FAST_MODELS[args.provider])
+    limits = {}
+    for name in models:
+        base = DEFAULT_LIMITS.get(name, {"rpm": 50, "tpm": 30000})
+        limits[name] = {"rpm": args.rpm or base["rpm"], "tpm": args.tpm or base["tpm"]}
+    return limits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AgentCamp New Hire 동시 사용자 부하 테스트")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--provider", choices=["mock", "claude", "openai"], default="claude")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--tiering", action="store_true", help="빠른 모델 우선 티어링 사용")
+    parser.add_argument("--unscheduled", action="store_true", help="스케줄러 없이 제공자 직접 호출")
+    parser.add_argument("--batch-users", type=int, default=0, help="batch 우선순위 가상 사용자 수")
+    parser.add_argument("--rpm", type=int, default=None, help="테스트 모델 RPM 한도")
+    parser.add_argument("--tpm", type=int, default=None, help="테스트 모델 TPM 한도")
+    parser.add_argument("--out", default=None, help="보고서 JSON 저장 경로 (없으면 stdout)")
+    args = parser.parse_args()
+
+    report = run_load_test(
+        users=args.users,
+        iterations=args.iterations,
+        provider=args.provider,
+        model=args.model,
+        server_config=FakeServerConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+        ),
+        think_ms=args.think_ms,
+        tiering=args.tiering,
+        scheduled=not args.unscheduled,
+        batch_users=args.batch_users,
+        rate_limits=_cli_rate_limits(args),
+    )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+memory.py - 대화 메모리 모듈
+책임: 사용자/Twin별 멀티턴 대화 보관 (최근 턴 원문 + 롤링 요약 + 토큰 상한)
+
+오래된 턴 요약은 백그라운드 스레드에서 갱신되므로 질문 처리 경로에는 요약 비용이 없다.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from llm_client import estimate_tokens
+
+Turn = Tuple[str, str]  # (질문, 답변)
+Summarizer = Callable[[str, List[Turn], int], str]
+
+# 요약 대기 턴 최대 개수 (요약이 밀려도 메모리 상한 유지)
+_MAX_OVERFLOW = 50
+
+
+def _first_sentence(text: str, limit: int = 80) -> str:
+    """첫 문장(또는 첫 줄)만 잘라 반환"""
+    line = next((ln.strip() for ln in text.splitlines() if ln.strip()), "")
+    for sep in (". ", "? ", "! ", "다. "):
+        if sep in line:
+            line = line.split(sep, 1)[0] + sep.strip()
+            break
+    return line[:limit]
+
+
+def extractive_summary(previous: str, turns: List[Turn], max_tokens: int) -> str:
+    """
+    기본 요약기: 턴별 질문/답변 첫 문장을 누적하고 상한을 넘으면 오래된 줄부터 제거
+
+    Args:
+        previous: 기존 요약
+        turns: 새로 요약할 턴 목록
+        max_tokens: 요약 토큰 상한
+
+    Returns:
+        갱신된 요약 문자열
+    """
+    lines = [ln for ln in previous.splitlines() if ln.strip()]
+    lines += [f"- Q: {_first_sentence(q)} / A: {_first_sentence(a)}" for q, a in turns]
+
+    while lines and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+@dataclass
+class _Conversation:
+    """사용자-Twin 대화 1건의 상태"""
+    turns: Deque[Turn] = field(default_factory=deque)
+    overflow: List[Turn] = field(default_factory=list)
+    summary: str = ""
+    refreshing: bool = False
+
+
+class ConversationMemory:
+    """사용자/Twin별 대화 메모리"""
+
+    def __init__(
+        self,
+        keep_turns: int = 3,
+        token_cap: int = 2000,
+        summary_tokens: int = 400,
+        summarizer: Optional[Summarizer] = None
+    ):
+        self.keep_turns = keep_turns
+        self.token_cap = token_cap
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or extractive_summary
+        self._lock = threading.Lock()
+        self._conversations: Dict[Tuple[str, str], _Conversation] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+    def context(
+        self,
+        user_id: str,
+        twin_name: str,
+        question: str
+    ) -> Tuple[List[Dict[str, str]], str]:
+        """
+        프롬프트에 넣을 대화 맥락 (토큰 상한 내)
+
+        Args:
+            user_id: 사용자 ID
+            twin_name: Twin 이름
+            question: 이번 질문 (상한 계산에 포함)
+
+        Returns:
+            (최근 턴 메시지 목록, 이전 대화 요약)
+        """
+        with self._lock:
+            conv = self._conversations.get((user_id, twin_name))
+            if conv is None:
+                return [], ""
+            turns = list(conv.turns)
+            summary = conv.summary
+
+        budget = self.token_cap - estimate_tokens(question)
+        summary = self._fit(summary, min(self.summary_tokens, max(0, budget // 3)))
+        budget -= estimate_tokens(summary) if summary else 0
+
+        # 최신 턴부터 상한 내에서 채움
+        selected: List[Turn] = []
+        for q, a in reversed(turns):
+            cost = estimate_tokens(q) + estimate_tokens(a)
+            if cost > budget:
+                break
+            selected.append((q, a))
+            budget -= cost
+
+        messages: List[Dict[str, str]] = []
+        for q, a in reversed(selected):
+            messages.append({"role": "user", "content": q})
+            messages.append({"role": "assistant", "content": a})
+        return messages, summary
+
+    def add_turn(self, user_id: str, twin_name: str, question: str, answer: str) -> None:
+        """턴 기록 (보관 개수를 넘은 턴은 비동기 요약 대상으로 이동)"""
+        key = (user_id, twin_name)
+        with self._lock:
+            conv = self._conversations.setdefault(key, _Conversation())
+            conv.turns.append((question, answer))
+            while len(conv.turns) > self.keep_turns:
+                conv.overflow.append(conv.turns.popleft())
+            del conv.overflow[:-_MAX_OVERFLOW]
+
+            if conv.overflow and not conv.refreshing:
+                conv.refreshing = True
+                self._executor.submit(self._refresh, key)
+
+    def reset(self, user_id: str, twin_name: Optional[str] = None) -> None:
+        """사용자 대화 초기화 (twin_name 없으면 전체)"""
+        with self._lock:
+            for key in list(self._conversations):
+                if key[0] == user_id and (twin_name is None or key[1] == twin_name):
+                    del self._conversations[key]
+
+    def _refresh(self, key: Tuple[str, str]) -> None:
+        """요약 대기 턴을 롤링 요약에 반영 (백그라운드)"""
+        while True:
+            with self._lock:
+                conv = self._conversations.get(key)
+                if conv is None:
+                    return
+                if not conv.overflow:
+                    conv.refreshing = False
+                    return
+                previous, pending = conv.summary, list(conv.overflow)
+
+            try:
+                summary = self.summarizer(previous, pending, self.summary_tokens)
+            except Exception:
+                summary = extractive_summary(previous, pending, self.summary_tokens)
+
+            with self._lock:
+                if self._conversations.get(key) is not conv:
+                    return
+                conv.summary = summary
+                consumed = [t for t in pending if t in conv.overflow]
+                for turn in consumed:
+                    conv.overflow.remove(turn)
+
+    def _fit(self, text: str, max_tokens: int) -> str:
+        """토큰 상한에 맞게 앞부분(오래된 내용)부터 잘라냄"""
+        if max_tokens <= 0:
+            return ""
+        while text and estimate_tokens(text) > max_tokens:
+            text = text.split("\n", 1)[1] if "\n" in text else text[-max_tokens * 3:]
+        return text
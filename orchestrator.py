@@ -5,7 +5,15 @@ orchestrator.py - 질문 라우팅 & 답변 생성 모듈
 from typing import Any, Dict, Optional
 
 from agents import TwinAgent
-from llm_client import BaseLLMClient, MockLLMClient, create_llm_client
+from llm_client import (
+    DOWNGRADE_MODELS,
+    BaseLLMClient,
+    MockLLMClient,
+    create_llm_client,
+)
+from memory import ConversationMemory
+from scheduler import INTERACTIVE
+from usage import DOWNGRADE, THROTTLE, get_meter
 
 # 라우팅 키워드 정의
 _ROUTING_RULES = {
@@ -14,14 +22,21 @@ _ROUTING_RULES = {
     "Seul Kim": ["ui", "ux", "화면", "프론트", "component", "반응형"],
 }
 
+# 제공자 오류 응답 접두어 (대화 메모리에 남기지 않음)
+_ERROR_PREFIXES = ("[Claude API 오류]", "[OpenAI API 오류]")
+
 # 글로벌 LLM 클라이언트 (기본: Mock)
 _llm_client: BaseLLMClient = MockLLMClient()
 
+# 사용자/Twin별 대화 메모리
+_memory = ConversationMemory()
+
 
 def set_llm_client(
     provider: str = "mock",
     api_key: Optional[str] = None,
-    model: Optional[str] = None
+    model: Optional[str] = None,
+    tiering: bool = False
 ) -> None:
     """
     LLM 클라이언트 설정
@@ -30,9 +45,10 @@ def set_llm_client(
         provider: "mock", "claude", "openai"
         api_key: API 키
         model: 모델명 (선택)
+        tiering: 빠른 모델 우선 티어링 사용 여부
     """
     global _llm_client
-    _llm_client = create_llm_client(provider, api_key, model)
+    _llm_client = create_llm_client(provider, api_key, model, tiering=tiering)
 
 
 def get_llm_client() -> BaseLLMClient:
@@ -40,6 +56,11 @@ def get_llm_client() -> BaseLLMClient:
     return _llm_client
 
 
+def get_memory() -> ConversationMemory:
+    """대화 메모리 반환"""
+    return _memory
+
+
 def route_agent(question: str) -> str:
     """
     질문 내용 기반 Digital Twin 라우팅
@@ -65,7 +86,9 @@ def answer_with_twin(
     org: Dict[str, Any],
     knowledge_snippets: str,
     question: str,
-    llm_client: Optional[BaseLLMClient] = None
+    llm_client: Optional[BaseLLMClient] = None,
+    user_id: Optional[str] = None,
+    priority: str = INTERACTIVE
 ) -> str:
     """
     Digital Twin으로 답변 생성
@@ -76,9 +99,38 @@ def answer_with_twin(
         knowledge_snippets: 관련 지식 스니펫
         question: 사용자 질문
         llm_client: LLM 클라이언트 (없으면 글로벌 클라이언트 사용)
+        user_id: 사용자 ID (대화 메모리 및 사용량/예산 집계 기준)
+        priority: 스케줄러 우선순위 ("interactive" 또는 "batch")
 
     Returns:
         답변 문자열
     """
-    client = llm_client or _llm_client
-    return client.generate_response(twin, org, knowledge_snippets, question)
+    client = (llm_client or _llm_client).with_priority(priority)
+    history, summary = [], ""
+    if user_id is not None:
+        history, summary = _memory.context(user_id, twin.name, question)
+
+    # 예산 판정: 제공자 호출 전에 차단 또는 저가 모델로 강등
+    # (통과 시 예상 토큰이 예약되어 동시에 들어온 질문들도 예산을 함께 나눠 씀)
+    meter = get_meter()
+    tenant = org.get("company")
+    estimated = client.estimate_request_tokens(
+        twin, org, knowledge_snippets, question, history, summary
+    )
+    decision = meter.check_budget(user_id, tenant, estimated, org.get("budgets"))
+    if decision == THROTTLE:
+        return "[사용량 제한] 오늘 토큰 예산을 모두 사용했습니다. 내일 다시 질문하거나 관리자에게 문의하세요."
+    if decision == DOWNGRADE:
+        client = client.with_model(DOWNGRADE_MODELS.get(client.model, client.model))
+
+    try:
+        answer = client.generate_response(
+            twin, org, knowledge_snippets, question,
+            history=history, summary=summary, user_id=user_id
+        )
+    finally:
+        # 실제 사용량은 클라이언트가 record로 반영했으므로 예약만 해제 (오류/미기록 시에도 해제)
+        meter.release(user_id, tenant, estimated)
+    if user_id is not None and not answer.startswith(_ERROR_PREFIXES):
+        _memory.add_turn(user_id, twin.name, question, answer)
+    return answer
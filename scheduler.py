@@ -0,0 +1,338 @@
+"""
+scheduler.py - LLM 요청 스케줄러 모듈
+책임: 제공자/모델별 RPM·TPM 토큰 버킷 + 사용자 간 가중 공정 큐(WFQ) + 우선순위 클래스
+
+- 모든 제공자 호출은 스케줄러를 거쳐 버킷에 여유가 있을 때만 나간다 (429 연쇄 방지).
+- 같은 우선순위 안에서는 사용자별 가상 종료 시각이 가장 이른 요청부터 처리한다.
+  (수다스러운 사용자 1명이 큐를 점유해도 다른 사용자의 요청이 사이사이 처리됨)
+- interactive 요청이 batch 요청보다 먼저 나간다. 오래 기다린 batch는 interactive로 취급한다.
+- TPM 버킷은 디스패치 시 예상 토큰(최대 출력 포함)을 예약하고, 응답 후 실제 usage로 정산한다.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+_PRIORITY_RANK = {INTERACTIVE: 0, BATCH: 1}
+
+# 모델별 기본 한도 (org.json의 rate_limits로 덮어쓰기)
+DEFAULT_LIMITS: Dict[str, Dict[str, int]] = {
+    "claude-sonnet-4-20250514": {"rpm": 50, "tpm": 30000},
+    "claude-3-5-sonnet-20241022": {"rpm": 50, "tpm": 40000},
+    "claude-3-haiku-20240307": {"rpm": 50, "tpm": 50000},
+    "gpt-4o": {"rpm": 500, "tpm": 30000},
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+    "gpt-4-turbo": {"rpm": 500, "tpm": 30000},
+}
+_FALLBACK_LIMITS = {"rpm": 50, "tpm": 30000}
+
+_WAIT_WINDOW = 500
+
+LimitKey = Tuple[str, str]  # (provider, model)
+
+
+class TokenBucket:
+    """분당 한도 기반 토큰 버킷 (용량 = 분당 한도)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount만큼 사용 가능해질 때까지 남은 시간(초)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """사용량 정산: 양수면 추가 차감, 음수면 환급 (용량 초과 환급 없음)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def resize(self, per_minute: float) -> None:
+        """한도 변경: 현재 토큰 잔량은 유지하고 새 용량으로만 제한"""
+        self._refill()
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = min(self.tokens, self.capacity)
+
+    def drain(self) -> None:
+        """제공자 429 응답 시 버킷을 비워 잠시 송신을 멈춤"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+@dataclass
+class _Request:
+    """큐에 대기 중인 LLM 호출 1건"""
+    key: LimitKey
+    user: str
+    priority: str
+    cost: int
+    start: float
+    finish: float
+    seq: int
+    fn: Callable[[], Any]
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class RequestScheduler:
+    """중앙 LLM 요청 스케줄러"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        batch_max_wait: float = 30.0,
+        limits: Optional[Dict[str, Dict[str, int]]] = None
+    ):
+        self.batch_max_wait = batch_max_wait
+        self._limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self._cv = threading.Condition()
+        self._queue: List[_Request] = []
+        self._seq = itertools.count()
+        self._vtime = 0.0
+        self._last_finish: Dict[str, float] = {}
+        self._weights: Dict[str, float] = {}
+        self._buckets: Dict[LimitKey, Tuple[TokenBucket, TokenBucket]] = {}
+        self._slots = threading.Semaphore(max_concurrency)
+        self._workers = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-sched")
+        self._dispatcher: Optional[threading.Thread] = None
+        self._in_flight = 0
+        self._dispatched = {INTERACTIVE: 0, BATCH: 0}
+        self._rate_limited = 0
+        self._waits: Dict[str, Deque[float]] = {
+            INTERACTIVE: deque(maxlen=_WAIT_WINDOW),
+            BATCH: deque(maxlen=_WAIT_WINDOW),
+        }
+
+    # ------------------------------------------------------------
+    # 설정
+    # ------------------------------------------------------------
+    def set_limits(self, limits: Dict[str, Dict[str, int]]) -> None:
+        """
+        모델별 RPM/TPM 한도 갱신 ({모델명: {"rpm", "tpm"}})
+
+        매 실행마다 호출되어도 한도가 바뀐 모델의 버킷만 크기를 조정하고,
+        현재 토큰 잔량은 유지한다 (재설정으로 버킷이 다시 가득 차지 않음).
+        """
+        with self._cv:
+            changed = {
+                model: value for model, value in limits.items()
+                if self._limits.get(model) != value
+            }
+            if not changed:
+                return
+            self._limits.update(changed)
+            for key, (req_bucket, tok_bucket) in self._buckets.items():
+                if key[1] in changed:
+                    req_bucket.resize(changed[key[1]]["rpm"])
+                    tok_bucket.resize(changed[key[1]]["tpm"])
+            self._cv.notify()
+
+    def settle(self, provider: str, model: str, reserved: int, actual: int) -> None:
+        """
+        호출 완료 후 TPM 예약분을 실제 사용량으로 정산
+
+        Args:
+            provider: 제공자
+            model: 모델명
+            reserved: 디스패치 시 예약한 예상 토큰 수
+            actual: 응답 usage 기준 실제 토큰 수
+        """
+        with self._cv:
+            _, tok_bucket = self._bucket((provider, model))
+            tok_bucket.adjust(actual - min(reserved, tok_bucket.capacity))
+            self._cv.notify()
+
+    def set_weight(self, user_id: str, weight: float) -> None:
+        """사용자 가중치 설정 (기본 1.0, 클수록 더 많은 몫)"""
+        with self._cv:
+            self._weights[user_id] = max(weight, 0.01)
+
+    # ------------------------------------------------------------
+    # 제출 / 디스패치
+    # ------------------------------------------------------------
+    def submit(
+        self,
+        provider: str,
+        model: str,
+        user_id: Optional[str],
+        fn: Callable[[], Any],
+        cost: int,
+        priority: str = INTERACTIVE
+    ) -> Future:
+        """
+        LLM 호출 예약
+
+        Args:
+            provider: 제공자 ("claude", "openai")
+            model: 모델명
+            user_id: 공정 큐 기준 사용자 ID
+            fn: 실제 호출 함수
+            cost: 예상 토큰 수 (TPM 버킷 차감 + WFQ 비용)
+            priority: INTERACTIVE 또는 BATCH
+
+        Returns:
+            호출 결과 Future
+        """
+        user = user_id or "(anonymous)"
+        with self._cv:
+            weight = self._weights.get(user, 1.0)
+            start = max(self._vtime, self._last_finish.get(user, 0.0))
+            finish = start + cost / weight
+            self._last_finish[user] = finish
+
+            req = _Request(
+                key=(provider, model), user=user, priority=priority,
+                cost=cost, start=start, finish=finish, seq=next(self._seq), fn=fn,
+            )
+            self._queue.append(req)
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+                self._dispatcher.start()
+            self._cv.notify()
+        return req.future
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            self._slots.acquire()
+            with self._cv:
+                while True:
+                    req, wait = self._pick()
+                    if req is not None:
+                        break
+                    self._cv.wait(timeout=wait)
+
+                self._queue.remove(req)
+                req_bucket, tok_bucket = self._bucket(req.key)
+                req_bucket.take(1)
+                tok_bucket.take(req.cost)
+                self._vtime = max(self._vtime, req.start)
+                self._in_flight += 1
+                self._dispatched[req.priority] += 1
+                self._waits[req.priority].append((time.monotonic() - req.enqueued) * 1000)
+
+            self._workers.submit(self._run, req)
+
+    def _pick(self) -> Tuple[Optional[_Request], Optional[float]]:
+        """
+        버킷 여유가 있는 요청 중 (우선순위, 가상 종료 시각) 최소 요청 선택 (cv 보유 상태)
+
+        같은 제공자/모델 안에서는 선두 요청만 후보가 되므로, 비용이 작은 뒷순위 요청이
+        TPM 여유를 먼저 가져가 선두 요청을 굶기지 않는다.
+        """
+        if not self._queue:
+            return None, None
+
+        now = time.monotonic()
+        heads: Dict[LimitKey, Tuple[Tuple[int, float, int], _Request]] = {}
+        for req in self._queue:
+            aged = req.priority == BATCH and now - req.enqueued > self.batch_max_wait
+            rank = (0 if aged else _PRIORITY_RANK[req.priority], req.finish, req.seq)
+            if req.key not in heads or rank < heads[req.key][0]:
+                heads[req.key] = (rank, req)
+
+        best: Optional[Tuple[Tuple[int, float, int], _Request]] = None
+        min_wait: Optional[float] = None
+        for key, (rank, req) in heads.items():
+            req_bucket, tok_bucket = self._bucket(key)
+            wait = max(req_bucket.wait_time(1), tok_bucket.wait_time(req.cost))
+            if wait > 0:
+                min_wait = wait if min_wait is None else min(min_wait, wait)
+            elif best is None or rank < best[0]:
+                best = (rank, req)
+
+        return (best[1] if best else None), min_wait
+
+    def _run(self, req: _Request) -> None:
+        try:
+            result = req.fn()
+            if is_rate_limited(result):
+                with self._cv:
+                    self._rate_limited += 1
+                    for bucket in self._bucket(req.key):
+                        bucket.drain()
+            req.future.set_result(result)
+        except Exception as e:
+            req.future.set_exception(e)
+        finally:
+            with self._cv:
+                self._in_flight -= 1
+                self._cv.notify()
+            self._slots.release()
+
+    def _bucket(self, key: LimitKey) -> Tuple[TokenBucket, TokenBucket]:
+        if key not in self._buckets:
+            limits = self._limits.get(key[1], _FALLBACK_LIMITS)
+            self._buckets[key] = (TokenBucket(limits["rpm"]), TokenBucket(limits["tpm"]))
+        return self._buckets[key]
+
+    # ------------------------------------------------------------
+    # 관측
+    # ------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        """큐 깊이, 대기 시간(p50/p95, ms), 처리 건수"""
+        with self._cv:
+            depth = {INTERACTIVE: 0, BATCH: 0}
+            per_user: Dict[str, int] = {}
+            for req in self._queue:
+                depth[req.priority] += 1
+                per_user[req.user] = per_user.get(req.user, 0) + 1
+
+            waits = {}
+            for priority, values in self._waits.items():
+                ordered = sorted(values)
+                waits[priority] = {
+                    "p50_ms": round(ordered[len(ordered) // 2], 1) if ordered else 0.0,
+                    "p95_ms": round(ordered[int(len(ordered) * 0.95)], 1) if ordered else 0.0,
+                }
+
+            return {
+                "queue_depth": depth,
+                "queue_by_user": per_user,
+                "in_flight": self._in_flight,
+                "dispatched": dict(self._dispatched),
+                "rate_limited": self._rate_limited,
+                "wait": waits,
+            }
+
+
+def is_rate_limited(result: Any) -> bool:
+    """클라이언트가 돌려준 오류 문자열이 429(요청 한도 초과)인지 판정"""
+    if not isinstance(result, str) or not result.startswith(("[Claude API 오류]", "[OpenAI API 오류]")):
+        return False
+    lower = result.lower()
+    return "429" in lower or "rate limit" in lower or "rate_limit" in lower
+
+
+# 프로세스 전역 스케줄러
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """전역 스케줄러 반환 (최초 호출 시 생성)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
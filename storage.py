@@ -24,6 +24,25 @@ _DEFAULTS = {
 }
 
 
+def set_data_dir(path: str) -> None:
+    """
+    데이터 디렉토리 변경 (부하 테스트 등 격리 실행용)
+
+    Args:
+        path: 새 데이터 디렉토리 경로
+    """
+    global DATA_DIR, ORG_PATH, KNOW_PATH, SESS_PATH
+    defaults = [_DEFAULTS[ORG_PATH], _DEFAULTS[KNOW_PATH], _DEFAULTS[SESS_PATH]]
+
+    DATA_DIR = path
+    ORG_PATH = os.path.join(DATA_DIR, "org.json")
+    KNOW_PATH = os.path.join(DATA_DIR, "knowledge.json")
+    SESS_PATH = os.path.join(DATA_DIR, "sessions.json")
+
+    _DEFAULTS.clear()
+    _DEFAULTS.update(zip([ORG_PATH, KNOW_PATH, SESS_PATH], defaults))
+
+
 def _ensure() -> None:
     """데이터 디렉토리 및 기본 파일 생성"""
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -0,0 +1,235 @@
+"""
+submissions.py - 제출 이력 저장소 모듈
+책임: 제출물 append-only 로그 보관 및 루브릭 변경 시 증분 재채점
+
+로그 형식 (data/submissions.jsonl, 한 줄당 레코드 1개):
+    제출:   {"op": "s", "id", "u": 사용자, "t": 미션 제목, "ts", "r": 루브릭 지문, "sc": 점수, "x": 제출 내용}
+    재채점: {"op": "r", "id", "r": 루브릭 지문, "sc": 점수}
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import storage
+from scoring import simple_review
+
+# 이 개수 이상이고 코어가 2개 이상일 때만 프로세스 풀로 병렬 재채점
+#   실측(simple_review 약 4µs/건): 인라인 250건 1ms · 2천건 8ms · 10만건 0.2s · 50만건 1.6s,
+#   spawn 풀 기동 고정비 약 80~100ms. 코어 4개 기준 손익분기 약 3만건이라 여유를 두고 5만건.
+#   (코어 1개에서는 50만건에서도 풀이 이기지 못함)
+_PARALLEL_THRESHOLD = 50_000
+_BATCH_SIZE = 5_000
+
+
+def rubric_fingerprint(keywords: List[str]) -> str:
+    """순서/대소문자 무관 루브릭 지문"""
+    normalized = sorted({kw.strip().lower() for kw in keywords if kw.strip()})
+    return hashlib.sha1("\x1f".join(normalized).encode("utf-8")).hexdigest()[:12]
+
+
+def _metric_contrib(score: int) -> Tuple[int, int]:
+    """점수 1건이 적응도/리스크에 주는 기여분 (app.py 제출 로직과 동일)"""
+    return int(score * 0.1), -int(score * 0.05)
+
+
+def apply_review_score(user: Dict[str, Any], score: int) -> None:
+    """
+    리뷰 점수를 사용자 적응도/리스크에 반영
+
+    클램프 전 누적값(adapt_raw/risk_raw)을 함께 보관해, 재채점 시 기여분 차이를 더해도
+    처음부터 재생한 결과와 같은 값이 나오도록 한다.
+    """
+    d_adapt, d_risk = _metric_contrib(score)
+    _shift_metrics(user, d_adapt, d_risk)
+
+
+def _shift_metrics(user: Dict[str, Any], d_adapt: int, d_risk: int) -> None:
+    """클램프 전 누적값을 이동하고 표시용 점수(0~100)를 다시 계산"""
+    user.setdefault("adapt_raw", user["adapt_score"])
+    user.setdefault("risk_raw", user["risk_score"])
+    user["adapt_raw"] += d_adapt
+    user["risk_raw"] += d_risk
+    user["adapt_score"] = max(0, min(100, user["adapt_raw"]))
+    user["risk_score"] = max(0, min(100, user["risk_raw"]))
+
+
+def _score_batch(keywords: List[str], texts: List[str]) -> List[int]:
+    """제출물 묶음 채점 (프로세스 풀 작업 단위)"""
+    task = {"acceptance_keywords": keywords}
+    return [simple_review(task, text)[0] for text in texts]
+
+
+class SubmissionLog:
+    """사용자/미션별 제출 이력 append-only 로그"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(storage.DATA_DIR, "submissions.jsonl")
+        self._lock = threading.Lock()
+        self._records: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def append(
+        self,
+        user_id: str,
+        task: Dict[str, Any],
+        submission: str,
+        score: int
+    ) -> str:
+        """
+        제출 기록 추가
+
+        Args:
+            user_id: 사용자 ID
+            task: 미션 정보 (title, acceptance_keywords)
+            submission: 제출 내용
+            score: simple_review 점수
+
+        Returns:
+            제출 레코드 ID
+        """
+        record = {
+            "op": "s",
+            "id": uuid.uuid4().hex[:16],
+            "u": user_id,
+            "t": task.get("title", ""),
+            "ts": int(time.time()),
+            "r": rubric_fingerprint(task.get("acceptance_keywords", [])),
+            "sc": score,
+            "x": submission,
+        }
+        with self._lock:
+            self._write([record])
+            if self._records is not None:
+                self._records[record["id"]] = record
+        return record["id"]
+
+    def history(self, user_id: str, task_title: Optional[str] = None) -> List[Dict[str, Any]]:
+        """사용자(및 미션)별 제출 이력 (재채점 반영, 시간순)"""
+        with self._lock:
+            records = self._load()
+            return [
+                dict(r) for r in records.values()
+                if r["u"] == user_id and (task_title is None or r["t"] == task_title)
+            ]
+
+    def rescore(
+        self,
+        keywords: List[str],
+        users: Dict[str, Dict[str, Any]],
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        루브릭 변경 시 영향받은 제출물만 재채점하고 사용자 지표를 증분 갱신
+
+        Args:
+            keywords: 새 acceptance_keywords
+            users: 세션의 users 딕셔너리 (제자리 갱신)
+            max_workers: 병렬 재채점 프로세스 수 (선택)
+
+        Returns:
+            {"affected": 재채점 건수, "changed": 점수 변경 건수, "user_ids": 지표가 바뀐 사용자 ID 목록}
+        """
+        fp = rubric_fingerprint(keywords)
+
+        with self._lock:
+            records = self._load()
+            stale = [r for r in records.values() if r["r"] != fp]
+            if not stale:
+                return {"affected": 0, "changed": 0, "user_ids": []}
+
+            new_scores = self._score_all(keywords, [r["x"] for r in stale], max_workers)
+
+            deltas: Dict[str, List[int]] = {}
+            updates = []
+            changed = 0
+            for rec, new_score in zip(stale, new_scores):
+                if new_score != rec["sc"]:
+                    changed += 1
+                    old_adapt, old_risk = _metric_contrib(rec["sc"])
+                    new_adapt, new_risk = _metric_contrib(new_score)
+                    delta = deltas.setdefault(rec["u"], [0, 0])
+                    delta[0] += new_adapt - old_adapt
+                    delta[1] += new_risk - old_risk
+                rec["r"] = fp
+                rec["sc"] = new_score
+                updates.append({"op": "r", "id": rec["id"], "r": fp, "sc": new_score})
+
+            self._write(updates)
+
+        user_ids = []
+        for uid, (d_adapt, d_risk) in deltas.items():
+            user = users.get(uid)
+            if user is None or (d_adapt == 0 and d_risk == 0):
+                continue
+            _shift_metrics(user, d_adapt, d_risk)
+            user_ids.append(uid)
+
+        return {"affected": len(stale), "changed": changed, "user_ids": user_ids}
+
+    def compact(self) -> None:
+        """재채점 레코드를 제출 레코드에 병합해 로그 재작성"""
+        with self._lock:
+            records = self._load()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for rec in records.values():
+                    f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, self.path)
+
+    def _score_all(
+        self,
+        keywords: List[str],
+        texts: List[str],
+        max_workers: Optional[int]
+    ) -> List[int]:
+        """
+        규모에 따라 인라인 또는 프로세스 풀로 채점
+
+        풀은 spawn 방식으로 만든다. Streamlit 프로세스에는 스케줄러/사용량 저장 스레드가 돌고 있어
+        fork하면 잠금 상태까지 복제될 수 있다.
+        """
+        if len(texts) < _PARALLEL_THRESHOLD or (os.cpu_count() or 1) < 2:
+            return _score_batch(keywords, texts)
+
+        batches = [texts[i:i + _BATCH_SIZE] for i in range(0, len(texts), _BATCH_SIZE)]
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            results = pool.map(_score_batch, [keywords] * len(batches), batches)
+            return [score for batch in results for score in batch]
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """로그 재생으로 최신 상태 인덱스 구성 (최초 1회)"""
+        if self._records is not None:
+            return self._records
+
+        records: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 중단된 마지막 줄 무시
+                    if entry["op"] == "s":
+                        records[entry["id"]] = entry
+                    elif entry["id"] in records:
+                        records[entry["id"]].update(r=entry["r"], sc=entry["sc"])
+        self._records = records
+        return records
+
+    def _write(self, entries: List[Dict[str, Any]]) -> None:
+        """로그 끝에 레코드 추가"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lines = "".join(
+            json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n" for e in entries
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
@@ -0,0 +1,131 @@
+"""
+tiering.py - 모델 티어링 정책 모듈
+책임: 질문 복잡도 로컬 분류, 답변 신뢰도 판정, 티어별 지연/승격률 집계
+"""
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from scheduler import is_rate_limited
+
+FAST = "fast"
+STRONG = "strong"
+
+# 복잡도 신호 키워드
+_COMPLEX_KEYWORDS = [
+    "왜", "설계", "비교", "차이", "트레이드오프", "아키텍처", "전략", "분석",
+    "장단점", "어떻게 하면", "우선순위", "판단", "리스크",
+    "why", "design", "compare", "trade-off", "tradeoff", "architecture", "strategy",
+]
+
+# 낮은 신뢰도 신호
+_HEDGES = [
+    "잘 모르", "확실하지", "알 수 없", "정보가 부족", "판단하기 어렵",
+    "i'm not sure", "i am not sure", "i don't know", "not certain",
+]
+_ERROR_PREFIXES = ("[Claude API 오류]", "[OpenAI API 오류]")
+
+_LATENCY_WINDOW = 500
+
+
+def classify_question(question: str, history: Optional[List[Dict[str, str]]] = None) -> str:
+    """
+    질문 복잡도 분류 (로컬 휴리스틱, 제공자 호출 없음)
+
+    Args:
+        question: 사용자 질문
+        history: 최근 대화 메시지 (선택)
+
+    Returns:
+        FAST(단순 조회) 또는 STRONG(복잡한 질문)
+    """
+    lower = question.lower()
+    score = 0
+
+    score += sum(1 for kw in _COMPLEX_KEYWORDS if kw in lower)
+    if len(question) > 150:
+        score += 2
+    elif len(question) > 80:
+        score += 1
+    if question.count("?") >= 2:
+        score += 1
+    if "```" in question or question.count("\n") >= 3:
+        score += 2
+    if history and len(history) >= 4:
+        score += 1  # 이어지는 긴 대화는 맥락 추론이 필요
+
+    return STRONG if score >= 2 else FAST
+
+
+def is_low_confidence(answer: str, question: str = "") -> bool:
+    """
+    답변 신뢰도가 낮아 상위 모델로 승격이 필요한지 판정
+
+    Args:
+        answer: 빠른 모델의 답변
+        question: 사용자 질문 (답변이 질문보다 짧으면 부실한 답변으로 간주)
+
+    Returns:
+        승격 필요 여부 (429 오류는 상위 모델도 같은 한도에 걸리므로 승격하지 않음)
+    """
+    text = answer.strip()
+    if text.startswith(_ERROR_PREFIXES):
+        return not is_rate_limited(text)
+    if len(text) < len(question.strip()):
+        return True
+    lower = text.lower()
+    return any(h in lower for h in _HEDGES)
+
+
+class TierStats:
+    """티어별 호출 수/지연, 분류 결과, 승격률 집계"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routed = {FAST: 0, STRONG: 0}
+        self._escalations = 0
+        self._latencies: Dict[str, Deque[float]] = {
+            FAST: deque(maxlen=_LATENCY_WINDOW),
+            STRONG: deque(maxlen=_LATENCY_WINDOW),
+        }
+        self._calls = {FAST: 0, STRONG: 0}
+
+    def routed(self, tier: str) -> None:
+        with self._lock:
+            self._routed[tier] += 1
+
+    def call(self, tier: str, seconds: float) -> None:
+        with self._lock:
+            self._calls[tier] += 1
+            self._latencies[tier].append(seconds * 1000)
+
+    def escalated(self) -> None:
+        with self._lock:
+            self._escalations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """티어별 호출 수, 지연(p50/p95, ms), 승격률"""
+        with self._lock:
+            tiers = {}
+            for tier, values in self._latencies.items():
+                ordered = sorted(values)
+                tiers[tier] = {
+                    "calls": self._calls[tier],
+                    "p50_ms": round(ordered[len(ordered) // 2], 1) if ordered else 0.0,
+                    "p95_ms": round(ordered[int(len(ordered) * 0.95)], 1) if ordered else 0.0,
+                }
+            fast_routed = self._routed[FAST]
+            return {
+                "routed": dict(self._routed),
+                "escalations": self._escalations,
+                "escalation_rate": round(self._escalations / fast_routed, 3) if fast_routed else 0.0,
+                "tiers": tiers,
+            }
+
+
+_stats = TierStats()
+
+
+def get_tier_stats() -> TierStats:
+    """전역 티어 통계 반환"""
+    return _stats
@@ -0,0 +1,264 @@
+"""
+timeseries.py - 사용자 지표 시계열 모듈
+책임: 링 버퍼(원시 포인트) + 시간별/일별 롤업으로 사용자 지표 추이 보관
+
+사용자당 메모리/파일 크기는 버퍼 용량으로 상한이 고정되며, 조회는 사용자 수나 누적 이벤트 수와 무관하다.
+파일에는 채워진 칸만 오래된 순으로 저장하고(점수류는 float32), 로드 시 링을 다시 구성한다.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+import storage
+
+RAW_CAPACITY = 256      # 최근 원시 포인트 개수
+HOURLY_CAPACITY = 168   # 7일
+DAILY_CAPACITY = 400    # 약 13개월
+
+_PERIODS = {"hourly": 3600, "daily": 86400}
+
+
+# 직렬화 타입: 시각/합계는 float64, 점수/개수/최소/최대는 float32
+_TS_TYPE = "d"
+_VALUE_TYPE = "f"
+
+
+def _encode(values: List[float], typecode: str) -> str:
+    return base64.b64encode(array(typecode, values).tobytes()).decode("ascii")
+
+
+def _decode(data: str, typecode: str) -> array:
+    arr = array(typecode)
+    arr.frombytes(base64.b64decode(data))
+    return arr
+
+
+class RingBuffer:
+    """고정 크기 (타임스탬프, 값) 링 버퍼"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.ts = array("d", [0.0] * capacity)
+        self.values = array("d", [0.0] * capacity)
+        self.head = 0   # 다음 쓰기 위치
+        self.size = 0
+
+    def append(self, ts: float, value: float) -> None:
+        self.ts[self.head] = ts
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def items(self) -> List[Tuple[float, float]]:
+        """오래된 순 (ts, value) 목록"""
+        start = (self.head - self.size) % self.capacity
+        return [
+            (self.ts[(start + i) % self.capacity], self.values[(start + i) % self.capacity])
+            for i in range(self.size)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """채워진 포인트만 오래된 순으로 직렬화"""
+        points = self.items()
+        return {
+            "cap": self.capacity,
+            "ts": _encode([p[0] for p in points], _TS_TYPE),
+            "v": _encode([p[1] for p in points], _VALUE_TYPE),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RingBuffer":
+        buf = cls(data["cap"])
+        for ts, value in zip(_decode(data["ts"], _TS_TYPE), _decode(data["v"], _VALUE_TYPE)):
+            buf.append(ts, value)
+        return buf
+
+
+class Rollup:
+    """고정 크기 구간 집계 링 (구간 시작, count, sum, min, max)"""
+
+    _FIELDS = ("start", "count", "sum", "min", "max")
+    _TYPES = {"start": _TS_TYPE, "count": _VALUE_TYPE, "sum": _TS_TYPE, "min": _VALUE_TYPE, "max": _VALUE_TYPE}
+
+    def __init__(self, period: int, capacity: int):
+        self.period = period
+        self.capacity = capacity
+        for name in self._FIELDS:
+            setattr(self, name, array("d", [0.0] * capacity))
+        self.head = 0   # 현재(최신) 구간 위치
+        self.size = 0
+
+    def add(self, ts: float, value: float) -> None:
+        bucket = ts - ts % self.period
+
+        if self.size and bucket < self.start[self.head]:
+            # 순서가 어긋난 과거 포인트: 보관 범위 안이면 해당 구간에 반영
+            idx = self._find(bucket)
+            if idx is not None:
+                self._merge(idx, value)
+            return
+
+        if not self.size or bucket > self.start[self.head]:
+            if self.size:
+                self.head = (self.head + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            self.start[self.head] = bucket
+            self.count[self.head] = 0
+            self.sum[self.head] = 0.0
+            self.min[self.head] = value
+            self.max[self.head] = value
+
+        self._merge(self.head, value)
+
+    def points(self) -> List[Dict[str, float]]:
+        """오래된 순 구간 집계 목록"""
+        start = (self.head - self.size + 1) % self.capacity
+        result = []
+        for i in range(self.size):
+            idx = (start + i) % self.capacity
+            count = self.count[idx]
+            result.append({
+                "ts": self.start[idx],
+                "count": int(count),
+                "avg": self.sum[idx] / count if count else 0.0,
+                "min": self.min[idx],
+                "max": self.max[idx],
+            })
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """채워진 구간만 오래된 순으로 직렬화"""
+        order = [(self.head - self.size + 1 + i) % self.capacity for i in range(self.size)]
+        data: Dict[str, Any] = {
+            name: _encode([getattr(self, name)[i] for i in order], self._TYPES[name])
+            for name in self._FIELDS
+        }
+        data.update(period=self.period, cap=self.capacity)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rollup":
+        rollup = cls(data["period"], data["cap"])
+        size = 0
+        for name in cls._FIELDS:
+            values = _decode(data[name], cls._TYPES[name])
+            getattr(rollup, name)[:len(values)] = array("d", values)
+            size = len(values)
+        rollup.size = size
+        rollup.head = max(size - 1, 0)
+        return rollup
+
+    def _find(self, bucket: float) -> Optional[int]:
+        for i in range(self.size):
+            idx = (self.head - i) % self.capacity
+            if self.start[idx] == bucket:
+                return idx
+        return None
+
+    def _merge(self, idx: int, value: float) -> None:
+        self.count[idx] += 1
+        self.sum[idx] += value
+        self.min[idx] = min(self.min[idx], value)
+        self.max[idx] = max(self.max[idx], value)
+
+
+class MetricSeries:
+    """지표 1개의 원시 링 버퍼 + 시간별/일별 롤업"""
+
+    def __init__(self) -> None:
+        self.raw = RingBuffer(RAW_CAPACITY)
+        self.rollups = {
+            "hourly": Rollup(_PERIODS["hourly"], HOURLY_CAPACITY),
+            "daily": Rollup(_PERIODS["daily"], DAILY_CAPACITY),
+        }
+
+    def add(self, ts: float, value: float) -> None:
+        self.raw.append(ts, value)
+        for rollup in self.rollups.values():
+            rollup.add(ts, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "raw": self.raw.to_dict(),
+            **{name: rollup.to_dict() for name, rollup in self.rollups.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricSeries":
+        series = cls()
+        series.raw = RingBuffer.from_dict(data["raw"])
+        series.rollups = {name: Rollup.from_dict(data[name]) for name in _PERIODS}
+        return series
+
+
+class TimeSeriesStore:
+    """사용자별 지표 시계열 저장소 (사용자당 파일 1개, 지연 로드)"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(storage.DATA_DIR, "timeseries")
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Dict[str, MetricSeries]] = {}
+
+    def record(
+        self,
+        user_id: str,
+        metrics: Dict[str, float],
+        ts: Optional[float] = None
+    ) -> None:
+        """
+        사용자 지표 포인트 기록
+
+        Args:
+            user_id: 사용자 ID
+            metrics: {지표명: 값} (예: adapt_score, risk_score)
+            ts: 유닉스 타임스탬프 (없으면 현재 시각)
+        """
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            series = self._get(user_id)
+            for name, value in metrics.items():
+                series.setdefault(name, MetricSeries()).add(ts, float(value))
+            self._save(user_id, series)
+
+    def recent(self, user_id: str, metric: str) -> List[Tuple[float, float]]:
+        """최근 원시 포인트 (오래된 순)"""
+        with self._lock:
+            series = self._get(user_id).get(metric)
+            return series.raw.items() if series else []
+
+    def rollup(self, user_id: str, metric: str, granularity: str = "hourly") -> List[Dict[str, float]]:
+        """시간별/일별 집계 (오래된 순)"""
+        with self._lock:
+            series = self._get(user_id).get(metric)
+            return series.rollups[granularity].points() if series else []
+
+    def _path(self, user_id: str) -> str:
+        name = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"{name}.json")
+
+    def _get(self, user_id: str) -> Dict[str, MetricSeries]:
+        if user_id not in self._cache:
+            series: Dict[str, MetricSeries] = {}
+            path = self._path(user_id)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                series = {name: MetricSeries.from_dict(d) for name, d in data["metrics"].items()}
+            self._cache[user_id] = series
+        return self._cache[user_id]
+
+    def _save(self, user_id: str, series: Dict[str, MetricSeries]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(user_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"user": user_id, "metrics": {name: s.to_dict() for name, s in series.items()}},
+                f, separators=(",", ":")
+            )
+        os.replace(tmp_path, path)
@@ -0,0 +1,274 @@
+"""
+usage.py - 토큰 사용량 집계 모듈
+책임: LLM 호출별 토큰 사용량 메모리 집계, 주기적 일괄 저장, 사용자/테넌트 예산 판정
+
+예산 판정은 이미 기록된 사용량 + 진행 중 호출의 예약분을 합쳐서 본다. check_budget이 통과시킨
+호출은 예상 토큰을 예약하고, 호출이 끝나면 release로 예약을 풀어 실제 사용량(record)만 남긴다.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import storage
+
+# 집계 키: (user, twin, provider, model)
+UsageKey = Tuple[str, str, str, str]
+
+_FIELDS = ("requests", "input_tokens", "output_tokens", "cached_tokens")
+_ANONYMOUS = "(anonymous)"
+
+# 예산 기본값 (org.json의 budgets로 덮어쓰기, None이면 무제한)
+DEFAULT_BUDGETS: Dict[str, Any] = {
+    "user_daily_tokens": None,
+    "tenant_daily_tokens": None,
+    "downgrade_ratio": 0.8,     # 예산의 이 비율을 넘으면 저가 모델로 강등
+    "on_exceed": "throttle",    # 예산 초과 시 "throttle"(차단) 또는 "downgrade"
+}
+
+ALLOW = "allow"
+DOWNGRADE = "downgrade"
+THROTTLE = "throttle"
+
+
+class UsageMeter:
+    """토큰 사용량 집계기 (메모리 집계 + 주기적 일괄 저장)"""
+
+    def __init__(self, flush_interval: float = 30.0):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._totals: Dict[UsageKey, Dict[str, int]] = {}
+        self._pending: Dict[UsageKey, Dict[str, int]] = {}
+        self._day = date.today().isoformat()
+        self._daily_users: Dict[str, int] = {}
+        self._daily_tenants: Dict[str, int] = {}
+        self._reserved_users: Dict[str, int] = {}
+        self._reserved_tenants: Dict[str, int] = {}
+        self._flusher: Optional[threading.Thread] = None
+        self._load()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(storage.DATA_DIR, "usage.json")
+
+    def record(
+        self,
+        user_id: Optional[str],
+        twin: str,
+        provider: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        cached_tokens: int = 0,
+        tenant: Optional[str] = None
+    ) -> None:
+        """
+        LLM 호출 1건의 사용량 기록
+
+        Args:
+            user_id: 사용자 ID (없으면 익명)
+            twin: Twin 이름
+            provider: "mock", "claude", "openai"
+            model: 모델명
+            input_tokens: 입력 토큰 수
+            output_tokens: 출력 토큰 수
+            cached_tokens: 캐시 적중 입력 토큰 수
+            tenant: 테넌트(회사명)
+        """
+        key = (user_id or _ANONYMOUS, twin, provider, model)
+        values = (1, input_tokens, output_tokens, cached_tokens)
+        spent = input_tokens + output_tokens
+
+        with self._lock:
+            for bucket in (self._totals, self._pending):
+                row = bucket.setdefault(key, dict.fromkeys(_FIELDS, 0))
+                for name, value in zip(_FIELDS, values):
+                    row[name] += value
+
+            self._roll_day()
+            self._daily_users[key[0]] = self._daily_users.get(key[0], 0) + spent
+            if tenant:
+                self._daily_tenants[tenant] = self._daily_tenants.get(tenant, 0) + spent
+
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+
+    def check_budget(
+        self,
+        user_id: Optional[str],
+        tenant: Optional[str],
+        estimated_tokens: int,
+        budgets: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        호출 전 예산 판정 + 예약
+
+        THROTTLE이 아니면 estimated_tokens를 사용자/테넌트 예약분에 더한다.
+        호출자는 호출이 끝난 뒤(성공/실패 무관) 반드시 같은 인자로 release를 호출해야 한다.
+
+        Args:
+            user_id: 사용자 ID
+            tenant: 테넌트(회사명)
+            estimated_tokens: 이번 호출 예상 토큰 수
+            budgets: 예산 설정 (org.json budgets)
+
+        Returns:
+            ALLOW / DOWNGRADE / THROTTLE
+        """
+        policy = {**DEFAULT_BUDGETS, **(budgets or {})}
+        user = user_id or _ANONYMOUS
+        with self._lock:
+            self._roll_day()
+            checks = [
+                (
+                    self._daily_users.get(user, 0) + self._reserved_users.get(user, 0),
+                    policy["user_daily_tokens"],
+                ),
+                (
+                    self._daily_tenants.get(tenant, 0) + self._reserved_tenants.get(tenant, 0) if tenant else 0,
+                    policy["tenant_daily_tokens"],
+                ),
+            ]
+
+            decision = ALLOW
+            for used, limit in checks:
+                if not limit:
+                    continue
+                if used + estimated_tokens > limit:
+                    if policy["on_exceed"] == THROTTLE:
+                        return THROTTLE
+                    decision = DOWNGRADE
+                elif used + estimated_tokens > limit * policy["downgrade_ratio"]:
+                    decision = DOWNGRADE
+
+            self._reserved_users[user] = self._reserved_users.get(user, 0) + estimated_tokens
+            if tenant:
+                self._reserved_tenants[tenant] = self._reserved_tenants.get(tenant, 0) + estimated_tokens
+            return decision
+
+    def release(self, user_id: Optional[str], tenant: Optional[str], estimated_tokens: int) -> None:
+        """
+        check_budget 예약 해제 (호출 완료 후, 실제 사용량은 record로 이미 반영됨)
+
+        Args:
+            user_id: 사용자 ID
+            tenant: 테넌트(회사명)
+            estimated_tokens: check_budget에 넘긴 예상 토큰 수
+        """
+        with self._lock:
+            for reserved, key in ((self._reserved_users, user_id or _ANONYMOUS), (self._reserved_tenants, tenant)):
+                if not key or key not in reserved:
+                    continue
+                left = reserved[key] - estimated_tokens
+                if left > 0:
+                    reserved[key] = left
+                else:
+                    del reserved[key]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """누적 사용량 목록 (사용자/Twin/Provider/모델별)"""
+        with self._lock:
+            return [
+                {"user": k[0], "twin": k[1], "provider": k[2], "model": k[3], **row}
+                for k, row in sorted(self._totals.items())
+            ]
+
+    def daily(self) -> Dict[str, Dict[str, int]]:
+        """오늘 사용자/테넌트별 사용 토큰"""
+        with self._lock:
+            self._roll_day()
+            return {"users": dict(self._daily_users), "tenants": dict(self._daily_tenants)}
+
+    def flush(self) -> None:
+        """대기 중인 사용량을 usage.json에 일괄 반영"""
+        with self._flush_lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            daily = {
+                "day": self._day,
+                "users": dict(self._daily_users),
+                "tenants": dict(self._daily_tenants),
+            }
+        if not pending:
+            return
+
+        try:
+            self._write(pending, daily)
+        except OSError:
+            # 저장 실패분은 대기열로 되돌려 다음 주기에 재시도
+            with self._lock:
+                for key, delta in pending.items():
+                    row = self._pending.setdefault(key, dict.fromkeys(_FIELDS, 0))
+                    for name in _FIELDS:
+                        row[name] += delta[name]
+            raise
+
+    def _write(self, pending: Dict[UsageKey, Dict[str, int]], daily: Dict[str, Any]) -> None:
+        data = self._read()
+        rows = {tuple(r["key"]): r for r in data["totals"]}
+        for key, delta in pending.items():
+            row = rows.setdefault(key, {"key": list(key), **dict.fromkeys(_FIELDS, 0)})
+            for name in _FIELDS:
+                row[name] += delta[name]
+        data["totals"] = list(rows.values())
+        data["daily"] = daily
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _roll_day(self) -> None:
+        """날짜가 바뀌면 일일 예산 카운터 초기화 (lock 보유 상태에서 호출)"""
+        today = date.today().isoformat()
+        if today != self._day:
+            self._day = today
+            self._daily_users = {}
+            self._daily_tenants = {}
+
+    def _read(self) -> Dict[str, Any]:
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"totals": [], "daily": {}}
+
+    def _load(self) -> None:
+        data = self._read()
+        for row in data["totals"]:
+            self._totals[tuple(row["key"])] = {name: row[name] for name in _FIELDS}
+        daily = data.get("daily", {})
+        if daily.get("day") == self._day:
+            self._daily_users = dict(daily.get("users", {}))
+            self._daily_tenants = dict(daily.get("tenants", {}))
+
+
+# 프로세스 전역 집계기
+_meter: Optional[UsageMeter] = None
+_meter_lock = threading.Lock()
+
+
+def get_meter() -> UsageMeter:
+    """전역 사용량 집계기 반환 (최초 호출 시 생성)"""
+    global _meter
+    with _meter_lock:
+        if _meter is None:
+            _meter = UsageMeter()
+            atexit.register(_meter.flush)
+        return _meter